@@ -1,145 +1,118 @@
 from __future__ import annotations
-from flask import Flask, request, jsonify, abort
-from groq import Groq
-from dotenv import load_dotenv
-from pathlib import Path
-from queue import Queue
-from services.downloader import Download
-from services.supabase import DBConnection
-from typing import List, Dict, Callable
-from threading import Thread
-from urllib.parse import urlparse, urljoin, parse_qs, urlencode, urlunparse
-
-import nest_asyncio
-import asyncio
-import html
-import httpx
-import os
-import re
-import requests
-import tempfile
-from utils.logger import logger
-import xml.etree.ElementTree as ET
+from utils.startup import import_profiler
+import_profiler.install()  # first, so the start-up report sees every import
+
+import contextvars
+import json
+import queue
+import threading
+import time
+import uuid
+from datetime import datetime, timezone
+from flask import Flask, Response, g, request, jsonify, abort, url_for, stream_with_context
+from werkzeug.exceptions import HTTPException, ServiceUnavailable, TooManyRequests
+from werkzeug.middleware.proxy_fix import ProxyFix
+from services.jobs import job_manager
+from services.news_cache import news_cache
+from services.resolver import resolve_urls
+from services.rss import feed_urls, is_allowed_feed, update_feeds
+from services.rss_scheduler import rss_scheduler
+from services.translation import translate_audio, translate_batch
+
+from utils.admission import AdmissionGate, RateLimiter
+from utils.config import config
+from utils.event_loop import background_loop
+from utils.lazy import preload
+from utils.logger import logger, request_id
+from utils.metrics import HTTP_SECONDS, HTTP_TOTAL, REGISTRY
 
 
 app = Flask(__name__)
-downloader = Download()
-nest_asyncio.apply()
-rss_url = "https://www.maariv.co.il/Rss/RssFeedsAllNews?id=msn"
+# remote_addr comes from X-Forwarded-For only as far as our own proxies appended it
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=config.TRUSTED_PROXY_HOPS,
+                        x_proto=config.TRUSTED_PROXY_HOPS)
 
-load_dotenv()  # pulls variables from .env into process env
+import_profiler.report(budget_ms=config.STARTUP_IMPORT_BUDGET_MS,
+                       detailed=config.STARTUP_IMPORT_REPORT)
+if config.PRELOAD_CLIENTS:
+    preload()  # yt-dlp, Supabase and Groq otherwise load on first use
 
-if os.name == "nt":                              
-    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+rss_scheduler.start()  # polls RSS_FEEDS in one worker when RSS_SCHEDULER_ENABLED
 
-groq_client = Groq()
+# Admission control (per worker): synchronous translations beyond the gate
+# wait briefly, then get 503; clients over their rate get 429.
+translation_gate = AdmissionGate("translation", config.TRANSLATION_MAX_INFLIGHT,
+                                 max_waiting=config.TRANSLATION_MAX_QUEUED,
+                                 wait_seconds=config.ADMISSION_WAIT_SECONDS,
+                                 retry_after=config.ADMISSION_RETRY_AFTER_SECONDS)
+translation_limiter = RateLimiter("translation", config.TRANSLATION_RATE_PER_MINUTE,
+                                  config.TRANSLATION_RATE_BURST)
+resolve_limiter = RateLimiter("resolve", config.RESOLVE_RATE_PER_MINUTE, config.RESOLVE_RATE_BURST)
 
-META_REFRESH_RE = re.compile(
-    r'<meta[^>]+http-equiv=["\']?refresh["\']?[^>]*content=["\']?\s*\d+\s*;\s*url=(.*?)["\'>]',
-    re.IGNORECASE
-)
 
-def _follow_meta_refresh(html_text: str, base_url: str) -> str | None:
+def client_key() -> str:
     """
-    Look for <meta http-equiv="refresh" …> and return the absolute URL, or None.
+    Identify the caller for rate limiting by its address, as seen by the
+    last of the ``TRUSTED_PROXY_HOPS`` proxies (see ``ProxyFix`` above).
     """
-    match = META_REFRESH_RE.search(html_text)
-    if not match:
-        return None
-    target = html.unescape(match.group(1).strip())
-    return urljoin(base_url, target)
-
-def resolve_url(url: str,
-                *,
-                timeout: float = 10.0,
-                max_hops: int = 10,
-                follow_meta: bool = False) -> str:
-    """
-    Return the final landing URL after following up to `max_hops` redirects.
-
-    Parameters
-    ----------
-    url : str
-        The starting URL.
-    timeout : float, default 10 s
-        Network timeout for each request.
-    max_hops : int, default 10
-        Safety limit to avoid redirect loops.
-    follow_meta : bool, default False
-        Also chase HTML meta-refresh redirects (one extra GET at most).
-    """
-    session = requests.Session()
-    session.max_redirects = max_hops       # extra guard
+    return request.remote_addr or "unknown"
 
-    try:
-        # Try HEAD first – it’s lighter, but some sites forbid it.
-        resp = session.head(url,
-                            allow_redirects=True,
-                            timeout=timeout,
-                            headers={"User-Agent": "python-redirect-check/1.0"})
-        final_url = resp.url
-        if resp.is_redirect:               # still in a redirect chain
-            final_url = resp.headers["Location"]
-    except requests.exceptions.RequestException:
-        # Fall back to GET (handles sites that disallow HEAD)
-        resp = session.get(url,
-                           allow_redirects=True,
-                           timeout=timeout,
-                           headers={"User-Agent": "python-redirect-check/1.0"})
-        final_url = resp.url
-
-    # Optional: follow one level of <meta http-equiv="refresh"> in the landing page
-    if follow_meta and resp.ok and "text/html" in resp.headers.get("content-type", ""):
-        next_url = _follow_meta_refresh(resp.text, final_url)
-        if next_url:
-            # one extra GET to verify (avoids infinite loops)
-            try:
-                resp = session.get(next_url,
-                                   allow_redirects=True,
-                                   timeout=timeout)
-                final_url = resp.url
-            except requests.exceptions.RequestException:
-                pass
 
-    return final_url
+@app.before_request
+def start_request():
+    g.started = time.perf_counter()
+    request_id.set(request.headers.get("X-Request-ID") or uuid.uuid4().hex)
+
+
+@app.after_request
+def finish_request(response):
+    response.headers["X-Request-ID"] = request_id.get()
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_TOTAL.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+    if "started" in g:
+        HTTP_SECONDS.observe(time.perf_counter() - g.started, endpoint=endpoint)
+    return response
+
 
 @app.route("/information", methods=["GET"])
 def server_info():
     logger.info("Server information")
     return jsonify("Utility Service"), 200
 
-def canonical_youtube_url(url: str, keep_params=('v',)) -> str:
+"""
+Prometheus metrics of this worker.
+"""
+@app.route("/metrics", methods=["GET"])
+def metrics():
     """
-    Return a cleaned-up YouTube URL that keeps only the query
-    parameters listed in *keep_params* (defaults to just 'v').
-    
-    Examples
-    --------
-    >>> canonical_youtube_url(
-    ...     "https://www.youtube.com/watch?v=JiJeZOHx0ow&pp=0gcJCdgAo7VqN5tD")
-    'https://www.youtube.com/watch?v=JiJeZOHx0ow'
-    
-    >>> canonical_youtube_url(
-    ...     "https://youtu.be/JiJeZOHx0ow?t=60", keep_params=())
-    'https://youtu.be/JiJeZOHx0ow'
+    GET /metrics
+    └─▶  Prometheus text format: per-stage latency histograms and outcomes
+         (util_stage_*), in-flight gauges, bytes moved, cache hit ratios.
+
+    Values are per worker process; ``util_process_info`` names the worker.
     """
-    parsed = urlparse(url)
-    
-    # Short youtu.be links rarely need any changes—just drop the query/fragment.
-    if parsed.netloc.endswith("youtu.be"):
-        return f"https://{parsed.netloc}{parsed.path}"
-    
-    # Long form: https://www.youtube.com/watch?v=...
-    if parsed.netloc.endswith("youtube.com") and parsed.path == "/watch":
-        qs = parse_qs(parsed.query)
-        # Retain only the desired parameters (order-preserving).
-        new_qs = [(k, v) for k, vs in qs.items() for v in vs if k in keep_params]
-        new_query = urlencode(new_qs, doseq=True)
-        cleaned = parsed._replace(query=new_query, fragment="")
-        return urlunparse(cleaned)
-    
-    # Anything else: return untouched.
-    return url
+    return Response(REGISTRY.render(), mimetype="text/plain; version=0.0.4; charset=utf-8")
+
+
+"""
+Resolve shortened / tracking links to their final URLs.
+"""
+@app.route("/resolve", methods=["POST"])
+def resolve_links():
+    """
+    POST  { "urls": ["https://bit.ly/…", …], "follow_meta": false }
+    └─▶  { "results": [ { "url": "…", "final_url": "…" } | { "url": "…", "error": "…" }, … ] }
+    """
+    resolve_limiter.check(client_key())
+    body = request.get_json(silent=True, force=True) or {}
+    urls = body.get("urls")
+    if not isinstance(urls, list) or not all(isinstance(u, str) and u for u in urls):
+        abort(400, description="`urls` must be a list of URLs")
+    if len(urls) > config.RESOLVE_MAX_BATCH:
+        abort(400, description=f"At most {config.RESOLVE_MAX_BATCH} URLs per request")
+
+    results = resolve_urls(urls, follow_meta=bool(body.get("follow_meta", False)))
+    return jsonify(results=results), 200
 
 """
 Translate from audio url using Groq.
@@ -149,159 +122,311 @@ def audio_translation():
     """
     POST  { "audio_url": "https://www.youtube.com/watch?v=eWRfhZUzrAc" }
     └─▶  { "text": "…transcript…" }
+
+    POST  { "audio_url": "…", "async": true }
+    └─▶  202 { "job_id": "…", "status": "queued", "status_url": "/audio/translation/jobs/…" }
+
+    POST  { "audio_url": "…", "chunked": true }
+    └─▶  { "text": "…", "segments": [ { "start": 0.0, "end": 4.2, "text": "…" }, … ] }
+
+    Videos with captions are answered from them without downloading audio:
+    └─▶  { "text": "…", "source": "captions", "language": "en" }
+    POST  { "audio_url": "…", "force_whisper": true }   always transcribes the audio
+
+    POST  { "audio_url": "…", "stream": "sse" | "ndjson" }   (or ?stream=…, or Accept header)
+    └─▶  event: resolved / captions / downloaded / transcoding / transcoded / transcribing
+         event: segment   { "start": …, "end": …, "text": "…" }   (one per transcript piece)
+         event: done      { "text": "…" }     | event: error { "error": "…", "code": 400 }
     """
     if not request.is_json:
         abort(400, description="Body must be JSON")
 
-    audio_url = request.get_json(silent=True, force=True).get("audio_url")
+    body = request.get_json(silent=True, force=True) or {}
+    audio_url = body.get("audio_url")
     if not audio_url:
         abort(400, description="`audio_url` is required")
 
-    final_url = resolve_url(audio_url)
+    chunked = body.get("chunked")
+    chunked = None if chunked is None else bool(chunked)
+    force_whisper = bool(body.get("force_whisper", False))
+    translation_limiter.check(client_key())
+
+    if body.get("async") or request.args.get("mode") == "async":
+        job = job_manager.submit("translation", translate_audio, audio_url, chunked=chunked,
+                                 force_whisper=force_whisper,
+                                 params={"audio_url": audio_url, "chunked": chunked,
+                                         "force_whisper": force_whisper})
+        status_url = url_for("translation_job_status", job_id=job.job_id)
+        return jsonify(job_id=job.job_id, status=job.status, status_url=status_url), \
+            202, {"Location": status_url}
+
+    stream_format = _stream_format(body)
+    if stream_format:
+        translation_gate.acquire()          # released by the streaming thread
+        return _stream_translation(audio_url, chunked, stream_format, force_whisper)
+
+    try:
+        with translation_gate:
+            return jsonify(translate_audio(audio_url, chunked=chunked, force_whisper=force_whisper)), 200
+    except (ServiceUnavailable, TooManyRequests):
+        raise
+    except Exception as e:
+        logger.error("Youtube Translation Error Failed.")                            
+        abort(400, description=f"Downloading Youtube or Translation Failed\n: {e}")
+
+
+STREAM_KEEPALIVE_SECONDS = 15
+STREAM_MIMETYPES = {"sse": "text/event-stream", "ndjson": "application/x-ndjson"}
 
-    if "youtube" in final_url.lower():
-        try:
-            with tempfile.TemporaryDirectory() as temp_dir:
-                
-                logger.info("Youtube Translation Processing")
-                youtube_url = canonical_youtube_url(final_url)
-                                
-                # ── 1.  Download the file safely to a temp location ────────────────
-                logger.info("Downloading Youtube started.")
-
-                downloaded_path = downloader.download_youtube_audio(youtube_url, temp_dir)
-                
-                logger.info("Downloading Youtube started.")
-                logger.info("Donwloading Youtube completed successfully.")
-
-                # ── 2.  Translation with Groq ────────────────────────────────────
-                logger.info("Audio Translation Started.")
-                
-                with open(downloaded_path, "rb") as file:
-                    translation = groq_client.audio.translations.create(
-                        file=(downloaded_path, file.read()),
-                        model="whisper-large-v3",
-                        response_format="json",  # Optional
-                        temperature=0.0  # Optional
-                        )
-
-                logger.info("\nAudio Translation Completed.\n")                            
-                return jsonify(text=translation.text), 200
-            
-        except Exception as e:
-            logger.error("Youtube Translation Error Failed.")                            
-            abort(400, description=f"Downloading Youtube or Translation Failed\n: {e}")
-    else : 
-        print("TODO")
 
-# ——— helpers ————————————————————————————————————————————————————————
-def _strip_ns(tag: str) -> str:
-    """Remove XML namespace from a tag."""
-    return re.sub(r"\{.*?\}", "", tag)
+def _stream_format(body: dict) -> str | None:
+    """Pick "sse" / "ndjson" from the body, the query string or the Accept header."""
+    choice = body.get("stream", request.args.get("stream"))
+    if choice in (True, "true", "1", "sse"):
+        return "sse"
+    if choice == "ndjson":
+        return "ndjson"
+    if choice is None:
+        best = request.accept_mimetypes.best
+        for name, mimetype in STREAM_MIMETYPES.items():
+            if best == mimetype:
+                return name
+    return None
 
-def _guid_key(val: str) -> str | int:
+
+def _stream_translation(audio_url: str, chunked: bool | None, stream_format: str,
+                        force_whisper: bool = False) -> Response:
     """
-    Choose the best sortable key for a guid:
-    • If it's all digits → return int(val)
-    • else → return the raw string (lexicographic sort)
+    Run the translation in a worker thread and stream its progress events.
+
+    Segments are written as soon as they are transcribed. A request served
+    from the transcript cache (or joining an in-flight one) gets its segments
+    replayed from the result before ``done``. The caller holds a slot of
+    ``translation_gate``, which is released when the translation ends.
     """
-    return int(val) if val and val.isdigit() else val
+    events: queue.Queue = queue.Queue()
+    rid = request_id.get()
 
-async def update_rss(source: str | Path,
-              sort_key: Callable[[str], str | int] = _guid_key,
-              descending: bool = False) -> List[Dict[str, str]]:
-    """Parse *path* and return a list[dict] sorted by guid."""
-    
-    if source.startswith(("http://", "https://")):
-        async with httpx.AsyncClient(timeout=20) as client:
-            r = await client.get(source)
-            r.raise_for_status()
-            xml_bytes = r.content
-        root = ET.fromstring(xml_bytes)
-    else:                                        # treat as local file
-        root = ET.parse(source).getroot()
-    items: List[Dict[str, str]] = []
-    for item in root.findall(".//item"):
-        rec: Dict[str, str] = { _strip_ns(c.tag): (c.text or "").strip()
-                                for c in item }
-        items.append(rec)
-
-    logger.info(f"News Count : {len(items)}")
-
-    # ---- sort by guid ----
-    items.sort(key=lambda d: sort_key(d.get("guid", "")), reverse=descending)
-    try : 
-        # Initialize database
-        db = DBConnection()
-        await db.initialize()
-        client = await db.client
-        logger.info(f"Updating Database...")
-        for item in items:
-            data = {
-                    "item_id":          item.get("itemID"),
-                    "title":            item.get("title"),
-                    "link":             item.get("link"),
-                    "photographer":     item.get("Photographer"),
-                    "pub_date":         item.get("pubDate"),     # consider parsing to datetime
-                    "description":      item.get("description"),
-                    "content":          item.get("encoded"),
-                    "dcterms_modified": item.get("modified"),
-                    "is_video":         item.get("isVideo"),
-                    "dc_creator":       item.get("creator"),
-                    "media_keywords":   item.get("keywords"),
-                    "category":         item.get("category"),
-            }
-            resp = await (client.table('rss_feed')
-                    .upsert(
-                        data, 
-                        on_conflict="item_id",
-                        ignore_duplicates=True
-                        )
-                    .execute()
-            )
-
-            if resp.data:                           #  ← only true when a row was returned
-                item_id = resp.data[0]['item_id']
-                logger.info("Inserted item_id=%s", item_id)
+    def run():
+        try:
+            result = translate_audio(audio_url, chunked=chunked, force_whisper=force_whisper,
+                                     on_event=lambda name, data: events.put((name, data)))
+            events.put(("_result", result))
+        except Exception as e:
+            logger.error(f"Streaming translation failed : {e}")
+            if isinstance(e, HTTPException):
+                events.put(("error", {"error": e.description, "code": e.code}))
             else:
-                logger.debug("Skipped duplicate %s", data["item_id"])
-        
-        await db.disconnect()
-        logger.info(f"Updated Database")
-        
-    
-    except Exception as e :
-        logger.error(f"Supabase Database Initialization failed : {e}")
-        raise
-
-def run_async(coroutine):
-    result_queue = Queue()
+                events.put(("error", {"error": f"Downloading Youtube or Translation Failed: {e}",
+                                      "code": 500}))
+        finally:
+            translation_gate.release()
+
+    def encode(name: str, data: dict) -> str:
+        payload = json.dumps({**data, "request_id": rid}, ensure_ascii=False)
+        if stream_format == "sse":
+            return f"event: {name}\ndata: {payload}\n\n"
+        return json.dumps({"event": name, **data, "request_id": rid}, ensure_ascii=False) + "\n"
+
+    def generate():
+        streamed = False
+        while True:
+            try:
+                name, data = events.get(timeout=STREAM_KEEPALIVE_SECONDS)
+            except queue.Empty:
+                yield ": keepalive\n\n" if stream_format == "sse" else "\n"
+                continue
+            if name == "_result":
+                if not streamed:
+                    for part in data.get("segments") or [{"text": data.get("text", "")}]:
+                        yield encode("segment", part)
+                yield encode("done", {"text": data.get("text", "")})
+                return
+            streamed = streamed or name == "segment"
+            yield encode(name, data)
+            if name == "error":
+                return
+
+    ctx = contextvars.copy_context()
+    threading.Thread(target=ctx.run, args=(run,), daemon=True, name="translation-stream").start()
+    return Response(stream_with_context(generate()),
+                    mimetype=STREAM_MIMETYPES[stream_format],
+                    headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+
+
+@app.route("/audio/translation/batch", methods=["POST"])
+def audio_translation_batch():
+    """
+    POST  { "audio_urls": ["https://youtu.be/…", …], "chunked": false }
+    └─▶  { "results": [ { "audio_url": "…", "video_id": "…", "status": "succeeded", "result": { "text": "…" } }
+                      | { "audio_url": "…", "video_id": "…", "status": "failed", "error": "…", "error_code": 400 }, … ],
+           "total": 3, "distinct": 2, "failed": 0, "elapsed_ms": 51234 }
 
-    def wrapper():
-        result = asyncio.run(coroutine)
-        result_queue.put(result)
+    POST  { "audio_urls": [ … ], "async": true }          ("force_whisper" as for single URLs)
+    └─▶  202 { "job_id": "…", "status": "queued", "status_url": "/audio/translation/jobs/…" }
+    """
+    body = request.get_json(silent=True, force=True) or {}
+    audio_urls = body.get("audio_urls")
+    if not isinstance(audio_urls, list) or not audio_urls or \
+            not all(isinstance(u, str) and u for u in audio_urls):
+        abort(400, description="`audio_urls` must be a non-empty list of URLs")
+    if len(audio_urls) > config.TRANSLATION_MAX_BATCH:
+        abort(400, description=f"At most {config.TRANSLATION_MAX_BATCH} URLs per request")
+
+    chunked = body.get("chunked")
+    chunked = None if chunked is None else bool(chunked)
+    force_whisper = bool(body.get("force_whisper", False))
+    translation_limiter.check(client_key())
+
+    if body.get("async") or request.args.get("mode") == "async":
+        job = job_manager.submit("translation_batch", translate_batch, audio_urls, chunked=chunked,
+                                 force_whisper=force_whisper,
+                                 params={"audio_urls": audio_urls, "chunked": chunked,
+                                         "force_whisper": force_whisper})
+        status_url = url_for("translation_job_status", job_id=job.job_id)
+        return jsonify(job_id=job.job_id, status=job.status, status_url=status_url), \
+            202, {"Location": status_url}
+
+    with translation_gate:
+        return jsonify(translate_batch(audio_urls, chunked=chunked, force_whisper=force_whisper)), 200
+
+
+@app.route("/audio/translation/jobs/<job_id>", methods=["GET"])
+def translation_job_status(job_id: str):
+    """
+    GET /audio/translation/jobs/<job_id>
+    └─▶  { "job_id": "…", "status": "queued" | "running" | "succeeded" | "failed",
+           "result": { "text": "…" } | null, "error": "…" | null, … }
+    """
+    job = job_manager.get(job_id)
+    if job is None or job.kind not in ("translation", "translation_batch"):
+        abort(404, description=f"Unknown job {job_id}")
+    return jsonify(job.as_dict()), 200
 
-    thread = Thread(target=wrapper)
-    thread.start()
-    thread.join()
-    return result_queue.get()
+def run_async(coroutine):
+    """Run *coroutine* on the worker's persistent event loop and return its result."""
+    return background_loop.run(coroutine)
 
 """
 Save updated news data into Supabase Database.
 """
 @app.route("/update-rss", methods=["GET"])
-async def update_news_content():
+def update_news_content():
+    """
+    GET /update-rss[?feed=<url>&feed=<url>][&force=1]
+    └─▶  { "status": "ok" | "partial", "inserted": …, "feeds": [ {per-feed summary}, … ] }
+
+    Ingests the configured ``RSS_FEEDS`` (or only the given ``feed`` URLs,
+    which must be listed in ``RSS_FEEDS`` or ``RSS_FEED_ALLOWLIST``)
+    concurrently. A feed already being ingested (by another request or the
+    scheduler) is not fetched again; the call waits for that run instead.
+    """
+    urls = request.args.getlist("feed") or feed_urls()
+    rejected = [url for url in urls if not is_allowed_feed(url)]
+    if rejected:
+        abort(400, description=f"Feeds not in RSS_FEEDS or RSS_FEED_ALLOWLIST: {', '.join(rejected)}")
     try:
-        run_async(update_rss(rss_url))
-        logger.info("update_rss(%s)", rss_url)
-        return jsonify({"status": "ok"}), 200
+        force = request.args.get("force", "").lower() in ("1", "true", "yes")
+        summary = run_async(update_feeds(urls, force=force))
+        logger.info("update_feeds(%d feeds) in %.0f ms", len(urls), summary["elapsed_ms"])
+        return jsonify(summary), 200
     
     except Exception as exc:
-        logger.exception("RSS update failed for %s", rss_url)
+        logger.exception("RSS update failed for %s", urls)
         return jsonify({
             "status": "error",
             "message": str(exc),
         }), 500
 
+@app.route("/update-rss/schedule", methods=["GET"])
+def rss_schedule():
+    """
+    GET /update-rss/schedule
+    └─▶  { "enabled": true, "running": true, "leader": true, "pid": 7, "error": null,
+           "feeds": [ { "url": "…", "interval": 120.0, "failures": 0, "next_poll_at": …, … } ] }
+
+    Only the worker holding the scheduler lock reports feeds; the others
+    show ``leader: false``.
+    """
+    return jsonify(rss_scheduler.status()), 200
+
+def _news_time(name: str) -> float | None:
+    """Read an ISO 8601 date or a UNIX timestamp from the query string."""
+    value = request.args.get(name)
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        moment = datetime.fromisoformat(value.replace("Z", "+00:00"))
+    except ValueError:
+        abort(400, description=f"`{name}` must be an ISO 8601 date or a UNIX timestamp")
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=timezone.utc)
+    return moment.timestamp()
+
+
+def _not_modified(etag: str) -> Response | None:
+    if etag in request.if_none_match:
+        response = Response(status=304)
+        response.set_etag(etag)
+        return response
+    return None
+
+
+def _news_response(payload: dict, etag: str) -> Response:
+    response = jsonify(payload)
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "no-cache"     # always revalidate, cheaply
+    return response
+
+
+@app.route("/news", methods=["GET"])
+def news():
+    """
+    GET /news[?category=…][&since=…][&until=…][&limit=50][&offset=0]
+    └─▶  { "items": [ { "item_id": "…", "title": "…", "pub_date": "…", … } ],
+           "total": 120, "limit": 50, "offset": 0, "categories": [ "…" ] }
+
+    Served from the in-memory cache of the newest ``NEWS_CACHE_SIZE``
+    ingested items, newest first. ``since``/``until`` take an ISO 8601 date
+    or a UNIX timestamp. Responses carry an ``ETag`` that changes only when a
+    refresh changes the cache; ``If-None-Match`` gets a bodiless 304.
+    """
+    snapshot = news_cache.snapshot()
+    not_modified = _not_modified(snapshot.etag)
+    if not_modified is not None:
+        return not_modified
+
+    limit = request.args.get("limit", 50, type=int)
+    offset = request.args.get("offset", 0, type=int)
+    if limit is None or not 0 < limit <= config.NEWS_MAX_LIMIT or offset is None or offset < 0:
+        abort(400, description=f"`limit` must be 1-{config.NEWS_MAX_LIMIT} and `offset` non-negative")
+
+    items = snapshot.query(category=request.args.get("category") or None,
+                           since=_news_time("since"), until=_news_time("until"))
+    return _news_response({"items": items[offset:offset + limit], "total": len(items),
+                           "limit": limit, "offset": offset,
+                           "categories": snapshot.categories()}, snapshot.etag)
+
+
+@app.route("/news/<item_id>", methods=["GET"])
+def news_item(item_id: str):
+    """
+    GET /news/<item_id>
+    └─▶  { "item_id": "…", "title": "…", … }   (404 once it has left the cache)
+    """
+    snapshot = news_cache.snapshot()
+    not_modified = _not_modified(snapshot.etag)
+    if not_modified is not None:
+        return not_modified
+    item = snapshot.by_id.get(item_id)
+    if item is None:
+        abort(404, description=f"News item {item_id} is not cached")
+    return _news_response(item, snapshot.etag)
+
+
 if __name__ == "__main__":
     app.run(debug=False, host="0.0.0.0", port=5000)
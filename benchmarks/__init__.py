@@ -0,0 +1,3 @@
+"""
+Offline benchmarks for the util service; see ``benchmarks.run``.
+"""
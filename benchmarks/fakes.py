@@ -0,0 +1,241 @@
+"""
+Local stand-ins for the services the app talks to, for offline benchmarks.
+
+* ``FakePostgREST`` – accepts PostgREST upserts (``Prefer: resolution=…``),
+  remembers conflict keys per table and returns only the rows it inserted or
+  merged, like Supabase with ``return=representation``; answers
+  ``?column=in.(…)`` selects from the stored rows.
+* ``FakeGroq``      – answers ``/openai/v1/audio/translations`` with a short
+  transcript (``json`` or ``verbose_json``) after reading the upload.
+* ``FakeMedia``     – serves synthetic audio files (with ``Range`` support)
+  and RSS feeds from a directory.
+
+Each server takes an artificial per-request latency and counts requests and
+bytes; ``GET /_stats`` returns the counters as JSON. :func:`start_fakes`
+runs all three in a child process, so their CPU and memory stay out of the
+measurements of the process under test.
+"""
+import json
+import multiprocessing
+import os
+import re
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+from urllib.parse import parse_qs, urlparse
+from urllib.request import urlopen
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"           # keep-alive, as the real services do
+    latency = 0.0
+    stats: Dict[str, float] = {}
+    lock = threading.Lock()
+
+    def log_message(self, *args: Any) -> None:
+        pass
+
+    def count(self, key: str, amount: float = 1) -> None:
+        with self.lock:
+            self.stats[key] = self.stats.get(key, 0) + amount
+
+    def reply(self, status: int, body: bytes = b"", content_type: str = "application/json",
+              headers: Optional[Dict[str, str]] = None) -> None:
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        if self.command != "HEAD":
+            self.wfile.write(body)
+
+    def read_body(self) -> bytes:
+        length = int(self.headers.get("Content-Length") or 0)
+        body = self.rfile.read(length) if length else b""
+        self.count("bytes_in", len(body))
+        return body
+
+    def handle_stats(self) -> bool:
+        if self.path != "/_stats":
+            return False
+        with self.lock:
+            payload = json.dumps(self.stats).encode()
+        self.reply(200, payload)
+        return True
+
+    def wait(self) -> None:
+        if self.latency:
+            time.sleep(self.latency)
+
+
+class FakePostgREST(_Handler):
+    stats: Dict[str, float] = {}
+    tables: Dict[str, Dict[Any, dict]] = {}
+
+    def do_HEAD(self) -> None:
+        self.count("requests")
+        self.reply(200)
+
+    def do_GET(self) -> None:
+        if self.handle_stats():
+            return
+        self.count("requests")
+        url = urlparse(self.path)
+        table = url.path.rsplit("/", 1)[-1]
+        filters = {key: values[0] for key, values in parse_qs(url.query).items()
+                   if values[0].startswith("in.(")}
+        self.wait()
+        with self.lock:
+            rows = list(self.tables.get(table, {}).values())
+        for column, expr in filters.items():
+            wanted = {value.strip('"') for value in expr[4:-1].split(",")}
+            rows = [row for row in rows if str(row.get(column)) in wanted]
+        self.reply(200, json.dumps(rows if filters else []).encode())
+
+    def do_POST(self) -> None:
+        self.count("requests")
+        rows = json.loads(self.read_body() or b"[]")
+        rows = rows if isinstance(rows, list) else [rows]
+        url = urlparse(self.path)
+        table = url.path.rsplit("/", 1)[-1]
+        conflict = (parse_qs(url.query).get("on_conflict") or ["id"])[0]
+        ignore = "ignore-duplicates" in self.headers.get("Prefer", "")
+        self.wait()
+        returned = []
+        with self.lock:
+            stored = self.tables.setdefault(table, {})
+            for row in rows:
+                key = row.get(conflict)
+                if key in stored and ignore:
+                    continue
+                stored[key] = row
+                returned.append(row)
+        self.count("rows_in", len(rows))
+        self.count("rows_written", len(returned))
+        self.reply(201, json.dumps(returned).encode())
+
+
+class FakeGroq(_Handler):
+    stats: Dict[str, float] = {}
+
+    def do_GET(self) -> None:
+        if not self.handle_stats():
+            self.reply(404, b"{}")
+
+    def do_POST(self) -> None:
+        self.count("requests")
+        body = self.read_body()
+        self.wait()
+        verbose = b'name="response_format"\r\n\r\nverbose_json' in body
+        text = f"transcript of {len(body)} bytes"
+        payload: Dict[str, Any] = {"text": text}
+        if verbose:
+            payload.update(duration=30.0, segments=[{"start": 0.0, "end": 30.0, "text": text}])
+        self.reply(200, json.dumps(payload).encode())
+
+
+class FakeMedia(_Handler):
+    stats: Dict[str, float] = {}
+    media_bytes = 1024 * 1024
+    feed_dir = "."
+    _RANGE_RE = re.compile(r"bytes=(\d+)-(\d*)")
+
+    def _media(self) -> bytes:
+        # deterministic filler with an MP3-ish header; content is never decoded
+        size = self.media_bytes
+        return (b"ID3" + bytes(range(256)) * (size // 256 + 1))[:size]
+
+    def do_HEAD(self) -> None:
+        self.do_GET()
+
+    def do_GET(self) -> None:
+        if self.handle_stats():
+            return
+        self.count("requests")
+        self.wait()
+        path = urlparse(self.path).path
+        if path.startswith("/feeds/"):
+            try:
+                with open(os.path.join(self.feed_dir, os.path.basename(path)), "rb") as fh:
+                    body = fh.read()
+            except OSError:
+                return self.reply(404, b"")
+            self.count("bytes_out", len(body))
+            return self.reply(200, body, "application/rss+xml")
+
+        body = self._media()
+        match = self._RANGE_RE.match(self.headers.get("Range", ""))
+        if match:
+            start = int(match.group(1))
+            end = int(match.group(2)) if match.group(2) else len(body) - 1
+            part = body[start:end + 1]
+            self.count("range_requests")
+            if self.command == "GET":
+                self.count("bytes_out", len(part))
+            return self.reply(206, part, "audio/mpeg",
+                              {"Accept-Ranges": "bytes",
+                               "Content-Range": f"bytes {start}-{end}/{len(body)}"})
+        if self.command == "GET":
+            self.count("bytes_out", len(body))
+        self.reply(200, body, "audio/mpeg", {"Accept-Ranges": "bytes"})
+
+
+def _serve(handler: type, port_queue: "multiprocessing.Queue", name: str) -> ThreadingHTTPServer:
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    port_queue.put((name, server.server_port))
+    return server
+
+
+def _run_fakes(port_queue: "multiprocessing.Queue", options: Dict[str, Any]) -> None:
+    FakePostgREST.latency = options.get("db_latency", 0.0)
+    FakeGroq.latency = options.get("groq_latency", 0.0)
+    FakeMedia.latency = options.get("media_latency", 0.0)
+    FakeMedia.media_bytes = int(options.get("media_mb", 1.0) * 1024 * 1024)
+    FakeMedia.feed_dir = options.get("feed_dir", ".")
+    _serve(FakePostgREST, port_queue, "postgrest")
+    _serve(FakeGroq, port_queue, "groq")
+    _serve(FakeMedia, port_queue, "media")
+    threading.Event().wait()
+
+
+class Fakes:
+    """Handle on the fake servers running in a child process."""
+
+    def __init__(self, process: multiprocessing.Process, urls: Dict[str, str]):
+        self.process = process
+        self.urls = urls
+
+    def stats(self) -> Dict[str, Dict[str, float]]:
+        """Current request/byte counters of every fake server."""
+        out = {}
+        for name, url in self.urls.items():
+            with urlopen(f"{url}/_stats", timeout=5) as resp:
+                out[name] = json.loads(resp.read())
+        return out
+
+    def stop(self) -> None:
+        self.process.terminate()
+        self.process.join(timeout=5)
+
+
+def start_fakes(**options: Any) -> Fakes:
+    """
+    Start the fake PostgREST, Groq and media servers in a child process.
+
+    Options: ``db_latency``, ``groq_latency``, ``media_latency`` (seconds per
+    request), ``media_mb`` (size of every media file) and ``feed_dir``
+    (directory served under ``/feeds/``).
+    """
+    ctx = multiprocessing.get_context("spawn")
+    port_queue = ctx.Queue()
+    process = ctx.Process(target=_run_fakes, args=(port_queue, options), daemon=True)
+    process.start()
+    urls = {}
+    for _ in range(3):
+        name, port = port_queue.get(timeout=30)
+        urls[name] = f"http://127.0.0.1:{port}"
+    return Fakes(process, urls)
@@ -0,0 +1,56 @@
+"""
+Synthetic RSS feeds for benchmarks.
+
+Feeds are built from the items of a real feed (``RssFeedsAllNews.rss`` by
+default), cycled and renumbered so every item has a unique ``guid`` and
+``itemID``. A *changed_every* stride rewrites some titles, to model a
+re-ingest where part of the feed was edited.
+"""
+import re
+from pathlib import Path
+from typing import List, Tuple, Union
+
+TEMPLATE_FEED = Path(__file__).resolve().parents[1] / "RssFeedsAllNews.rss"
+
+_ITEM_RE = re.compile(r"<item>.*?</item>", re.DOTALL)
+_GUID_RE = re.compile(r"(<guid[^>]*>)\s*[^<]*(</guid>)")
+_ITEM_ID_RE = re.compile(r"(<itemID>)[^<]*(</itemID>)")
+_TITLE_RE = re.compile(r"(<title><!\[CDATA\[)")
+
+
+def _split_template(template: Union[str, Path]) -> Tuple[str, List[str], str]:
+    text = Path(template).read_text(encoding="utf-8")
+    items = _ITEM_RE.findall(text)
+    if not items:
+        raise ValueError(f"No <item> elements in {template}")
+    head = text[:text.index(items[0])]
+    tail = text[text.rindex(items[-1]) + len(items[-1]):]
+    return head, items, tail
+
+
+def synthesize_feed(out_path: Union[str, Path],
+                    n_items: int,
+                    template: Union[str, Path] = TEMPLATE_FEED,
+                    first_id: int = 1,
+                    changed_every: int = 0,
+                    revision: int = 0) -> Path:
+    """
+    Write a feed of *n_items* renumbered template items to *out_path*.
+
+    With *changed_every* > 0, every n-th item's title is prefixed with
+    ``[rev <revision>]`` so it hashes differently from earlier revisions.
+    """
+    head, items, tail = _split_template(template)
+    out_path = Path(out_path)
+    with out_path.open("w", encoding="utf-8") as fh:
+        fh.write(head)
+        for i in range(n_items):
+            item_id = first_id + i
+            item = _GUID_RE.sub(rf"\g<1>{item_id}\g<2>", items[i % len(items)])
+            item = _ITEM_ID_RE.sub(rf"\g<1>{item_id}\g<2>", item)
+            if changed_every and revision and i % changed_every == 0:
+                item = _TITLE_RE.sub(rf"\g<1>[rev {revision}] ", item, count=1)
+            fh.write(item)
+            fh.write("\n")
+        fh.write(tail)
+    return out_path
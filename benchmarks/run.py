@@ -0,0 +1,306 @@
+"""
+Offline benchmark suite.
+
+Runs the RSS ingestion and the audio translation endpoints against local
+fakes of Supabase (PostgREST), Groq and media/feed hosting (see
+``benchmarks.fakes``); nothing leaves the machine and no credentials are
+needed.
+
+    python -m benchmarks.run                                  # everything, default sizes
+    python -m benchmarks.run --suite rss --items 1000 10000 50000 --stream
+    python -m benchmarks.run --suite translation --requests 64 --concurrency 8 --groq-latency 0.5
+    python -m benchmarks.run --compare benchmarks/results/20261018-120000.json
+
+Every scenario reports wall time, throughput, p50/p99 latency, requests and
+rows seen by the fakes, and memory. ``rss_peak_mb`` is the process
+high-water mark, so scenarios run from small to large. Results are saved as
+JSON under ``--output`` (default ``benchmarks/results``); ``--compare``
+prints the relative change of each metric against an earlier run.
+"""
+import argparse
+import json
+import math
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Sequence
+
+from benchmarks.fakes import Fakes, start_fakes
+from benchmarks.feeds import TEMPLATE_FEED, synthesize_feed
+
+REPO_ROOT = Path(__file__).resolve().parents[1]
+DEFAULT_OUTPUT = Path(__file__).resolve().parent / "results"
+
+# Compared between runs; "higher is better" for rates, lower for the rest
+_HIGHER_IS_BETTER = {"items_per_sec", "requests_per_sec"}
+_COMPARED = ("items_per_sec", "requests_per_sec", "elapsed_s", "p50_ms", "p99_ms",
+             "db_requests", "groq_requests", "rss_peak_mb")
+
+
+def percentile(values: Sequence[float], pct: float) -> float:
+    """Nearest-rank percentile of *values* (0 for an empty sequence)."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, min(len(ordered), math.ceil(pct / 100 * len(ordered))))
+    return ordered[rank - 1]
+
+
+def _mb(n_bytes: float) -> float:
+    return round(n_bytes / 2**20, 1)
+
+
+def _delta(before: Dict[str, Dict[str, float]], after: Dict[str, Dict[str, float]],
+           server: str, key: str) -> int:
+    return int(after.get(server, {}).get(key, 0) - before.get(server, {}).get(key, 0))
+
+
+def configure_environment(fakes: Fakes, workdir: Path, args: argparse.Namespace) -> None:
+    """Point the app at the fakes and keep its files inside *workdir*."""
+    os.environ.update({
+        "ENV_MODE": "production",                     # console logs at WARNING only
+        "SUPABASE_URL": fakes.urls["postgrest"],
+        "SUPABASE_ANON_KEY": "benchmark",
+        "SUPABASE_SERVICE_ROLE_KEY": "benchmark",
+        "GROQ_API_KEY": "benchmark",
+        "GROQ_BASE_URL": fakes.urls["groq"],
+        "RSS_INDEX_PATH": str(workdir / "data" / "rss_index.db"),
+        "RSS_SCHEDULER_ENABLED": "false",
+        "TRANSCRIPT_CACHE_ENABLED": "false",
+        "TRANSCRIPT_CACHE_DIR": str(workdir / "data" / "transcripts"),
+        "JOBS_DIR": str(workdir / "data" / "jobs"),
+        "AUDIO_PREPROCESS": "true" if args.preprocess else "false",
+        "RSS_STREAM_PARSE": "true" if args.stream else "false",
+        "TRANSLATION_RATE_PER_MINUTE": "0",           # measure the pipeline, not the limiter
+        "RESOLVE_RATE_PER_MINUTE": "0",
+    })
+    os.chdir(workdir)
+    if str(REPO_ROOT) not in sys.path:
+        sys.path.insert(0, str(REPO_ROOT))
+
+
+# ── RSS ingestion ────────────────────────────────────────────────────────────
+
+def _prepare_feeds(feed_dir: Path, sizes: Sequence[int]) -> List[Dict[str, Any]]:
+    feed_dir.mkdir(parents=True, exist_ok=True)
+    shutil.copy(TEMPLATE_FEED, feed_dir / "original.rss")
+    feeds = [{"name": "original", "file": "original.rss", "items": None}]
+    for k, size in enumerate(sorted(sizes)):
+        name = f"synthetic-{size}"
+        # disjoint ID ranges, so feeds don't collide in the fake database
+        synthesize_feed(feed_dir / f"{name}.rss", size, first_id=10_000_000 * (k + 1))
+        feeds.append({"name": name, "file": f"{name}.rss", "items": size, "first_id": 10_000_000 * (k + 1)})
+    return feeds
+
+
+def run_rss_suite(fakes: Fakes, feed_dir: Path, sizes: Sequence[int]) -> List[Dict[str, Any]]:
+    """Ingest each feed cold, with 10% edits, unchanged and not modified."""
+    from services.rss import _shared_client, update_rss
+    from utils.event_loop import background_loop
+    from utils.memory import current_rss, peak_rss
+
+    async def _ingest(url: str, force: bool) -> Dict[str, Any]:
+        return await update_rss(url, force=force, client=_shared_client())
+
+    results = []
+    for feed in _prepare_feeds(feed_dir, sizes):
+        url = f"{fakes.urls['media']}/feeds/{feed['file']}"
+        scenarios = [("cold", True), ("edited-10pct", True), ("unchanged", True), ("not-modified", False)]
+        for scenario, force in scenarios:
+            if scenario == "edited-10pct":
+                if feed["items"] is None:
+                    continue
+                synthesize_feed(feed_dir / feed["file"], feed["items"], first_id=feed["first_id"],
+                                changed_every=10, revision=1)
+            before = fakes.stats()
+            started = time.perf_counter()
+            counts = background_loop.run(_ingest(url, force))
+            elapsed = time.perf_counter() - started
+            after = fakes.stats()
+            items = counts.get("items", 0)
+            results.append({
+                "suite": "rss",
+                "name": f"{feed['name']}/{scenario}",
+                "items": items,
+                "inserted": counts.get("inserted", 0),
+                "updated": counts.get("updated", 0),
+                "unchanged": counts.get("unchanged", 0),
+                "not_modified": bool(counts.get("not_modified")),
+                "elapsed_s": round(elapsed, 3),
+                "items_per_sec": round(items / elapsed, 1) if elapsed and items else 0.0,
+                "db_requests": _delta(before, after, "postgrest", "requests"),
+                "db_rows_written": _delta(before, after, "postgrest", "rows_written"),
+                "feed_bytes": _delta(before, after, "media", "bytes_out"),
+                "rss_mb": _mb(current_rss()),
+                "rss_peak_mb": _mb(peak_rss()),
+            })
+            _print_row(results[-1])
+    return results
+
+
+# ── audio translation ────────────────────────────────────────────────────────
+
+def run_translation_suite(fakes: Fakes, n_requests: int, concurrency: int) -> List[Dict[str, Any]]:
+    """POST /audio/translation (one by one, concurrently) and /audio/translation/batch."""
+    import app as app_module
+    from utils.memory import current_rss, peak_rss
+
+    client_app = app_module.app
+    media = fakes.urls["media"]
+    results = []
+
+    def _one(i: int, run: str) -> Dict[str, Any]:
+        with client_app.test_client() as client:
+            started = time.perf_counter()
+            resp = client.post("/audio/translation", json={"audio_url": f"{media}/{run}/episode-{i}.mp3"})
+            return {"status": resp.status_code, "ms": (time.perf_counter() - started) * 1000}
+
+    for name, workers in (("sequential", 1), (f"concurrent-{concurrency}", concurrency)):
+        before = fakes.stats()
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            outcomes = list(pool.map(lambda i: _one(i, name), range(n_requests)))
+        elapsed = time.perf_counter() - started
+        results.append(_translation_result(name, outcomes, elapsed, before, fakes.stats(),
+                                           current_rss(), peak_rss()))
+        _print_row(results[-1])
+
+    before = fakes.stats()
+    started = time.perf_counter()
+    with client_app.test_client() as client:
+        urls = [f"{media}/batch/episode-{i}.mp3" for i in range(n_requests)]
+        resp = client.post("/audio/translation/batch", json={"audio_urls": urls})
+    elapsed = time.perf_counter() - started
+    body = resp.get_json() or {}
+    outcomes = [{"status": 200 if r.get("status") == "succeeded" else r.get("error_code", 500),
+                 "ms": elapsed * 1000} for r in body.get("results", [])]
+    results.append(_translation_result("batch", outcomes, elapsed, before, fakes.stats(),
+                                       current_rss(), peak_rss()))
+    _print_row(results[-1])
+    return results
+
+
+def _translation_result(name: str, outcomes: List[Dict[str, Any]], elapsed: float,
+                        before: Dict, after: Dict, rss: int, peak: int) -> Dict[str, Any]:
+    latencies = [o["ms"] for o in outcomes]
+    statuses: Dict[str, int] = {}
+    for o in outcomes:
+        statuses[str(o["status"])] = statuses.get(str(o["status"]), 0) + 1
+    return {
+        "suite": "translation",
+        "name": name,
+        "requests": len(outcomes),
+        "statuses": statuses,
+        "elapsed_s": round(elapsed, 3),
+        "requests_per_sec": round(len(outcomes) / elapsed, 2) if elapsed else 0.0,
+        "p50_ms": round(percentile(latencies, 50), 1),
+        "p99_ms": round(percentile(latencies, 99), 1),
+        "groq_requests": _delta(before, after, "groq", "requests"),
+        "groq_upload_mb": _mb(_delta(before, after, "groq", "bytes_in")),
+        "media_requests": _delta(before, after, "media", "requests"),
+        "media_download_mb": _mb(_delta(before, after, "media", "bytes_out")),
+        "rss_mb": _mb(rss),
+        "rss_peak_mb": _mb(peak),
+    }
+
+
+# ── reporting ────────────────────────────────────────────────────────────────
+
+def _print_row(result: Dict[str, Any]) -> None:
+    keys = [k for k in ("items_per_sec", "requests_per_sec", "elapsed_s", "p50_ms", "p99_ms",
+                        "db_requests", "groq_requests", "rss_peak_mb") if k in result]
+    print(f"{result['suite']:<12} {result['name']:<28} " + "  ".join(f"{k}={result[k]}" for k in keys),
+          flush=True)
+
+
+def compare(current: Dict[str, Any], previous_path: Path) -> None:
+    """Print the relative change of every compared metric against *previous_path*."""
+    previous = json.loads(previous_path.read_text(encoding="utf-8"))
+    old = {(r["suite"], r["name"]): r for r in previous.get("results", [])}
+    print(f"\nCompared with {previous_path} ({previous.get('meta', {}).get('commit', '?')}):")
+    for result in current["results"]:
+        base = old.get((result["suite"], result["name"]))
+        if base is None:
+            continue
+        changes = []
+        for key in _COMPARED:
+            if key in result and base.get(key):
+                change = (result[key] - base[key]) / base[key] * 100
+                better = change > 0 if key in _HIGHER_IS_BETTER else change < 0
+                mark = "=" if abs(change) < 0.5 else ("better" if better else "worse")
+                changes.append(f"{key} {base[key]} -> {result[key]} ({change:+.1f}%, {mark})")
+        if changes:
+            print(f"  {result['suite']}/{result['name']}: " + "; ".join(changes))
+
+
+def _git_commit() -> Optional[str]:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, timeout=10).stdout.strip() or None
+    except (OSError, subprocess.SubprocessError):
+        return None
+
+
+def parse_args(argv: Optional[Sequence[str]] = None) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0],
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--suite", choices=("all", "rss", "translation"), default="all")
+    parser.add_argument("--items", type=int, nargs="+", default=[1000, 10000],
+                        help="sizes of the synthetic feeds (default: 1000 10000)")
+    parser.add_argument("--stream", action="store_true", help="ingest with RSS_STREAM_PARSE")
+    parser.add_argument("--requests", type=int, default=16, help="translation requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="concurrent translation clients")
+    parser.add_argument("--preprocess", action="store_true", help="run ffmpeg preprocessing (needs ffmpeg)")
+    parser.add_argument("--db-latency", type=float, default=0.005, help="seconds per PostgREST request")
+    parser.add_argument("--groq-latency", type=float, default=0.2, help="seconds per Groq request")
+    parser.add_argument("--media-latency", type=float, default=0.02, help="seconds per media/feed request")
+    parser.add_argument("--media-mb", type=float, default=2.0, help="size of each fake media file")
+    parser.add_argument("--output", type=Path, default=DEFAULT_OUTPUT, help="directory for result files")
+    parser.add_argument("--compare", type=Path, help="earlier result file to compare against")
+    return parser.parse_args(argv)
+
+
+def main(argv: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+    args = parse_args(argv)
+    output = args.output.resolve()
+    compare_to = args.compare.resolve() if args.compare else None
+    workdir = Path(tempfile.mkdtemp(prefix="util-bench-"))
+    fakes = start_fakes(db_latency=args.db_latency, groq_latency=args.groq_latency,
+                        media_latency=args.media_latency, media_mb=args.media_mb,
+                        feed_dir=str(workdir / "feeds"))
+    try:
+        configure_environment(fakes, workdir, args)
+        results: List[Dict[str, Any]] = []
+        if args.suite in ("all", "rss"):
+            results += run_rss_suite(fakes, workdir / "feeds", args.items)
+        if args.suite in ("all", "translation"):
+            results += run_translation_suite(fakes, args.requests, args.concurrency)
+    finally:
+        fakes.stop()
+        os.chdir(REPO_ROOT)
+        shutil.rmtree(workdir, ignore_errors=True)
+
+    run = {"meta": {"timestamp": datetime.now().isoformat(timespec="seconds"),
+                    "commit": _git_commit(),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "args": {k: str(v) if isinstance(v, Path) else v for k, v in vars(args).items()}},
+           "results": results}
+    output.mkdir(parents=True, exist_ok=True)
+    path = output / f"{datetime.now().strftime('%Y%m%d-%H%M%S')}.json"
+    path.write_text(json.dumps(run, indent=2), encoding="utf-8")
+    print(f"\nSaved results to {path}")
+    if compare_to:
+        compare(run, compare_to)
+    return run
+
+
+if __name__ == "__main__":
+    main()
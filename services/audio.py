@@ -0,0 +1,195 @@
+"""
+Audio helpers built on ffmpeg (via ``ffmpeg-python``).
+
+Used to shrink downloads into a compact speech format before upload, and to
+split long recordings into overlapping segments, preferably cut inside
+silences, so they can be transcribed in parallel.
+"""
+import os
+import re
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+import ffmpeg
+
+from utils.logger import logger
+
+_SILENCE_START_RE = re.compile(r"silence_start:\s*(-?[\d.]+)")
+_SILENCE_END_RE = re.compile(r"silence_end:\s*(-?[\d.]+)")
+
+
+@dataclass
+class Segment:
+    """A slice of the source audio.
+
+    ``start``/``end`` delimit the part of the transcript this segment owns;
+    ``cut_start``/``cut_end`` are the actual bounds extracted, including the
+    overlap shared with neighbouring segments.
+    """
+    index: int
+    start: float
+    end: float
+    cut_start: float
+    cut_end: float
+    path: Optional[str] = None
+
+
+@dataclass
+class PreprocessResult:
+    """Outcome of :func:`preprocess_audio`."""
+    path: str
+    original_bytes: int
+    processed_bytes: int
+    seconds: float
+
+    @property
+    def saved_bytes(self) -> int:
+        return self.original_bytes - self.processed_bytes
+
+
+# codec name -> (file extension, ffmpeg output options)
+_SPEECH_FORMATS = {
+    "opus": (".ogg", {"acodec": "libopus", "application": "voip", "format": "ogg"}),
+    "flac": (".flac", {"acodec": "flac", "format": "flac"}),
+}
+
+
+def preprocess_audio(path: str,
+                     out_dir: str,
+                     codec: str = "opus",
+                     bitrate: str = "32k",
+                     sample_rate: int = 16000,
+                     trim_silence: bool = False) -> PreprocessResult:
+    """
+    Transcode *path* to mono *sample_rate* Hz speech audio in *out_dir*.
+
+    *codec* is ``"opus"`` (lossy, very small at *bitrate*) or ``"flac"``
+    (lossless). With *trim_silence*, pauses longer than a second are cut out;
+    timestamps then refer to the trimmed audio. If ffmpeg fails or the result
+    is not smaller than the input, the original file is returned unchanged.
+    """
+    if codec not in _SPEECH_FORMATS:
+        raise ValueError(f"Unsupported codec {codec!r}; expected one of {sorted(_SPEECH_FORMATS)}")
+    started = time.perf_counter()
+    original = os.path.getsize(path)
+    ext, options = _SPEECH_FORMATS[codec]
+    out_path = os.path.join(out_dir, f"{os.path.splitext(os.path.basename(path))[0]}.speech{ext}")
+
+    options = dict(options, ac=1, ar=sample_rate, vn=None)
+    if codec == "opus":
+        options["audio_bitrate"] = bitrate
+    if trim_silence:
+        options["af"] = "silenceremove=stop_periods=-1:stop_duration=1:stop_threshold=-45dB"
+
+    try:
+        (ffmpeg
+         .input(path)
+         .output(out_path, **options)
+         .overwrite_output()
+         .run(capture_stdout=True, capture_stderr=True, quiet=True))
+    except (ffmpeg.Error, OSError) as e:
+        detail = e.stderr.decode("utf-8", errors="replace")[-500:] if getattr(e, "stderr", None) else e
+        logger.warning(f"Audio preprocessing failed, uploading original : {detail}")
+        return PreprocessResult(path, original, original, time.perf_counter() - started)
+
+    processed = os.path.getsize(out_path)
+    elapsed = time.perf_counter() - started
+    if processed >= original:
+        logger.info(f"Preprocessed audio not smaller ({processed} >= {original} bytes), keeping original")
+        os.remove(out_path)
+        return PreprocessResult(path, original, original, elapsed)
+
+    logger.info(f"Preprocessed audio to {codec}: {original} -> {processed} bytes "
+                f"(saved {original - processed}, {elapsed:.1f}s)")
+    return PreprocessResult(out_path, original, processed, elapsed)
+
+
+def probe_duration(path: str) -> float:
+    """Return the duration of *path* in seconds."""
+    info = ffmpeg.probe(path)
+    duration = info.get("format", {}).get("duration")
+    if duration is None:
+        streams = [s for s in info.get("streams", []) if s.get("duration")]
+        duration = streams[0]["duration"] if streams else 0
+    return float(duration)
+
+
+def detect_silences(path: str,
+                    noise_db: int = -35,
+                    min_silence: float = 0.4) -> List[Tuple[float, float]]:
+    """Return ``(start, end)`` pairs of the silences ffmpeg finds in *path*."""
+    try:
+        _, err = (ffmpeg
+                  .input(path)
+                  .filter("silencedetect", noise=f"{noise_db}dB", d=min_silence)
+                  .output("-", format="null")
+                  .run(capture_stdout=True, capture_stderr=True, quiet=True))
+    except (ffmpeg.Error, OSError) as e:
+        logger.warning(f"Silence detection failed, cutting on fixed boundaries : {e}")
+        return []
+    text = err.decode("utf-8", errors="replace")
+    starts = [float(m) for m in _SILENCE_START_RE.findall(text)]
+    ends = [float(m) for m in _SILENCE_END_RE.findall(text)]
+    return list(zip(starts, ends))
+
+
+def plan_segments(duration: float,
+                  silences: List[Tuple[float, float]],
+                  target_seconds: float,
+                  overlap_seconds: float,
+                  search_seconds: Optional[float] = None) -> List[Segment]:
+    """
+    Split ``[0, duration]`` into segments of about *target_seconds*.
+
+    Each boundary moves to the middle of the silence closest to the ideal cut,
+    if one lies within *search_seconds* (default: a fifth of the target).
+    Every segment is then widened by *overlap_seconds* on both sides, so
+    words straddling a cut are heard in full by one of the two segments.
+    """
+    if duration <= 0:
+        return []
+    search = target_seconds / 5 if search_seconds is None else search_seconds
+    midpoints = [(s + e) / 2 for s, e in silences]
+
+    bounds = [0.0]
+    while duration - bounds[-1] > target_seconds * 1.2:
+        ideal = bounds[-1] + target_seconds
+        nearby = [m for m in midpoints if abs(m - ideal) <= search and m > bounds[-1]]
+        bounds.append(min(nearby, key=lambda m: abs(m - ideal)) if nearby else ideal)
+    bounds.append(duration)
+
+    return [Segment(index=i,
+                    start=start,
+                    end=end,
+                    cut_start=max(0.0, start - overlap_seconds),
+                    cut_end=min(duration, end + overlap_seconds))
+            for i, (start, end) in enumerate(zip(bounds, bounds[1:]))]
+
+
+def cut_segment(path: str, segment: Segment, out_dir: str) -> str:
+    """Extract *segment* from *path* into *out_dir* without re-encoding."""
+    ext = os.path.splitext(path)[1] or ".m4a"
+    out_path = os.path.join(out_dir, f"segment_{segment.index:04d}{ext}")
+    (ffmpeg
+     .input(path, ss=segment.cut_start, t=segment.cut_end - segment.cut_start)
+     .output(out_path, acodec="copy", vn=None)
+     .overwrite_output()
+     .run(quiet=True))
+    segment.path = out_path
+    return out_path
+
+
+def split_audio(path: str,
+                out_dir: str,
+                target_seconds: float,
+                overlap_seconds: float,
+                on_silence: bool = True) -> List[Segment]:
+    """Plan and cut overlapping segments of *path* into *out_dir*."""
+    duration = probe_duration(path)
+    silences = detect_silences(path) if on_silence else []
+    segments = plan_segments(duration, silences, target_seconds, overlap_seconds)
+    for segment in segments:
+        cut_segment(path, segment, out_dir)
+    logger.info(f"Split {duration:.0f}s of audio into {len(segments)} segment(s)")
+    return segments
@@ -0,0 +1,141 @@
+"""
+Caption tracks from yt-dlp metadata, as a fast alternative to Whisper.
+
+yt-dlp lists a video's uploaded subtitles under ``subtitles`` and YouTube's
+speech-recognition captions under ``automatic_captions``; automatic tracks
+in the spoken language carry a ``-orig`` suffix, the others are machine
+translations. :func:`pick_track` chooses the best track for the wanted
+languages and :func:`fetch_captions` downloads it (``json3`` preferred,
+``vtt`` otherwise) and turns it into plain text plus timed segments.
+"""
+import html
+import re
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import requests
+
+from utils.logger import logger
+
+_FORMATS = ("json3", "vtt")
+_TIMING_RE = re.compile(r"(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})\s+-->\s+(?:(\d+):)?(\d{2}):(\d{2})[.,](\d{3})")
+_TAG_RE = re.compile(r"<[^>]+>")
+_SOUND_RE = re.compile(r"\[[^\]]*\]|\([A-Z ]+\)")      # [Music], [Applause], (LAUGHTER)
+_SPACE_RE = re.compile(r"\s+")
+
+
+def normalize_text(text: str) -> str:
+    """Strip markup, sound annotations and speaker markers; collapse whitespace."""
+    text = html.unescape(_TAG_RE.sub("", text))
+    text = _SOUND_RE.sub(" ", text).replace(">>", " ")
+    return _SPACE_RE.sub(" ", text).strip()
+
+
+def _matches(track_lang: str, languages: Iterable[str]) -> Optional[int]:
+    """Rank of the first wanted language *track_lang* belongs to (``en`` matches ``en-GB``)."""
+    base = track_lang.lower()
+    for rank, lang in enumerate(languages):
+        if base == lang or base.startswith(lang + "-"):
+            return rank
+    return None
+
+
+def pick_track(info: Dict[str, Any],
+               languages: List[str],
+               allow_translated: bool = False) -> Optional[Tuple[str, str, Dict[str, Any]]]:
+    """
+    Return ``(language, kind, format)`` of the best caption track, or None.
+
+    Uploaded subtitles win over automatic captions, then the order of
+    *languages* decides. Automatic captions are used only in the spoken
+    language (``-orig`` tracks) unless *allow_translated*.
+    """
+    languages = [lang.lower() for lang in languages]
+    candidates = []
+    for kind, tracks in (("manual", info.get("subtitles") or {}),
+                         ("auto", info.get("automatic_captions") or {})):
+        for lang, formats in tracks.items():
+            if kind == "auto" and not lang.endswith("-orig") and not allow_translated:
+                continue
+            rank = _matches(lang.removesuffix("-orig"), languages)
+            if rank is None:
+                continue
+            by_ext = {f.get("ext"): f for f in formats if f.get("url")}
+            fmt = next((by_ext[ext] for ext in _FORMATS if ext in by_ext), None)
+            if fmt is not None:
+                candidates.append((kind != "manual", rank, not lang.endswith("-orig"), lang, kind, fmt))
+    if not candidates:
+        return None
+    *_, lang, kind, fmt = min(candidates, key=lambda c: c[:3])
+    return lang.removesuffix("-orig"), kind, fmt
+
+
+def parse_json3(data: Dict[str, Any]) -> List[Dict[str, Any]]:
+    """Timed segments from YouTube's ``json3`` caption format."""
+    segments = []
+    for event in data.get("events") or []:
+        text = normalize_text("".join(seg.get("utf8", "") for seg in event.get("segs") or []))
+        if not text:
+            continue
+        start = event.get("tStartMs", 0) / 1000
+        segments.append({"start": round(start, 2),
+                         "end": round(start + event.get("dDurationMs", 0) / 1000, 2),
+                         "text": text})
+    return segments
+
+
+def _seconds(h: Optional[str], m: str, s: str, ms: str) -> float:
+    return int(h or 0) * 3600 + int(m) * 60 + int(s) + int(ms) / 1000
+
+
+def parse_vtt(text: str) -> List[Dict[str, Any]]:
+    """
+    Timed segments from WebVTT.
+
+    Automatic captions repeat the previous line at the top of each cue
+    ("roll-up" captions); lines already emitted are skipped.
+    """
+    segments: List[Dict[str, Any]] = []
+    last_line = None
+    for block in re.split(r"\n\s*\n", text.replace("\r\n", "\n")):
+        lines = block.strip().split("\n")
+        timing = next((i for i, line in enumerate(lines) if _TIMING_RE.search(line)), None)
+        if timing is None:
+            continue
+        g = _TIMING_RE.search(lines[timing]).groups()
+        new_lines = []
+        for line in lines[timing + 1:]:
+            line = normalize_text(line)
+            if line and line != last_line:
+                new_lines.append(line)
+                last_line = line
+        if new_lines:
+            segments.append({"start": round(_seconds(*g[:4]), 2),
+                             "end": round(_seconds(*g[4:]), 2),
+                             "text": " ".join(new_lines)})
+    return segments
+
+
+def fetch_captions(info: Dict[str, Any],
+                   session: requests.Session,
+                   languages: List[str],
+                   allow_translated: bool = False,
+                   timeout: float = 10.0) -> Optional[Dict[str, Any]]:
+    """
+    Download the best caption track of *info* and return
+    ``{"text", "segments", "language", "kind"}``, or None when the video has
+    no usable track or it comes back empty.
+    """
+    track = pick_track(info, languages, allow_translated)
+    if track is None:
+        return None
+    lang, kind, fmt = track
+    resp = session.get(fmt["url"], timeout=timeout)
+    resp.raise_for_status()
+    segments = parse_json3(resp.json()) if fmt.get("ext") == "json3" else parse_vtt(resp.text)
+    if not segments:
+        logger.info(f"Caption track {lang}/{kind} is empty")
+        return None
+    return {"text": " ".join(s["text"] for s in segments),
+            "segments": segments,
+            "language": lang,
+            "kind": kind}
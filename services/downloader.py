@@ -1,13 +1,123 @@
+import copy
 import os
+import queue
+import tempfile
+import threading
+import weakref
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
 from pathlib import Path
-import yt_dlp
-from yt_dlp.utils import DownloadError
+from typing import Iterator, List, Optional, Tuple
+from urllib.parse import urlparse
+import ffmpeg
+import requests
+from requests.adapters import HTTPAdapter
 from werkzeug.exceptions import BadRequest
+from services.audio import probe_duration
+from services.captions import fetch_captions
+from services.resolver import youtube_video_id
+from utils.cache import TTLCache
+from utils.config import config
+from utils.lazy import lazy_import
 from utils.logger import logger
+from utils.metrics import REGISTRY, track_stage
+
+yt_dlp = lazy_import("yt_dlp")                   # ~100 ms to import; only YouTube needs it
 
 MAX_DURATION_MINUTES = 30
 MAX_FILE_SIZE_MB = 100
 
+MEDIA_CHUNK_BYTES = 256 * 1024
+
+# Content-Type -> file extension for direct media links (ffmpeg sniffs the
+# real format, the extension only has to be plausible)
+_MEDIA_EXTENSIONS = {
+    'audio/mpeg': '.mp3', 'audio/mp3': '.mp3', 'audio/mp4': '.m4a', 'audio/x-m4a': '.m4a',
+    'audio/aac': '.aac', 'audio/ogg': '.ogg', 'audio/opus': '.opus', 'audio/wav': '.wav',
+    'audio/x-wav': '.wav', 'audio/flac': '.flac', 'audio/webm': '.webm',
+    'video/mp4': '.mp4', 'video/webm': '.webm', 'video/quicktime': '.mov',
+}
+
+_media_session: Optional[requests.Session] = None
+_media_session_lock = threading.Lock()
+
+
+def _shared_media_session() -> requests.Session:
+    """Return the process-wide pooled session used for direct media downloads."""
+    global _media_session
+    if _media_session is None:
+        with _media_session_lock:
+            if _media_session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=config.MEDIA_POOL_SIZE,
+                                      pool_maxsize=config.MEDIA_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                # byte ranges must address the stored representation
+                session.headers.update({'User-Agent': 'Mozilla/5.0 (compatible; util-service)',
+                                        'Accept-Encoding': 'identity'})
+                _media_session = session
+    return _media_session
+
+
+class _RangeNotSupported(Exception):
+    """The server answered a range request with something other than 206."""
+
+
+def _media_extension(url: str, content_type: str) -> str:
+    ext = os.path.splitext(urlparse(url).path)[1].lower()
+    if ext and len(ext) <= 5 and ext[1:].isalnum():
+        return ext
+    return _MEDIA_EXTENSIONS.get(content_type, '.bin')
+
+
+def _stream_to_file(resp: requests.Response, path: str, max_bytes: int) -> int:
+    """Write a streamed body to *path*, aborting as soon as it exceeds *max_bytes*."""
+    written = 0
+    with open(path, 'wb') as fh:
+        for chunk in resp.iter_content(chunk_size=MEDIA_CHUNK_BYTES):
+            written += len(chunk)
+            if written > max_bytes:
+                raise BadRequest(f"File size exceeds {MAX_FILE_SIZE_MB}MB limit")
+            fh.write(chunk)
+    return written
+
+
+def _split_ranges(size: int, parts: int) -> List[Tuple[int, int]]:
+    """Inclusive ``(start, end)`` byte ranges covering *size* bytes in *parts* pieces."""
+    step = -(-size // parts)
+    return [(start, min(start + step, size) - 1) for start in range(0, size, step)]
+
+
+def _fetch_ranges(session: requests.Session, url: str, path: str, size: int, parts: int) -> None:
+    """Download *size* bytes of *url* into *path* as *parts* parallel range requests."""
+    with open(path, 'wb') as fh:
+        fh.truncate(size)
+
+    def _fetch(byte_range: Tuple[int, int]) -> None:
+        start, end = byte_range
+        expected = end - start + 1
+        with session.get(url, headers={'Range': f'bytes={start}-{end}'}, stream=True,
+                         timeout=config.MEDIA_TIMEOUT_SECONDS) as resp:
+            if resp.status_code != 206:
+                raise _RangeNotSupported(f"HTTP {resp.status_code} for bytes {start}-{end}")
+            written = 0
+            with open(path, 'r+b') as fh:
+                fh.seek(start)
+                for chunk in resp.iter_content(chunk_size=MEDIA_CHUNK_BYTES):
+                    written += len(chunk)
+                    if written > expected:
+                        raise _RangeNotSupported(f"Oversized part for bytes {start}-{end}")
+                    fh.write(chunk)
+        if written != expected:
+            raise OSError(f"Incomplete part for bytes {start}-{end}: {written}/{expected}")
+
+    ranges = _split_ranges(size, parts)
+    with ThreadPoolExecutor(max_workers=len(ranges), thread_name_prefix="media-range") as pool:
+        for _ in pool.map(_fetch, ranges):
+            pass
+
+
 class Download:
     def __init__(self, output_dir=os.getcwd(),  debug=False):
         self.output_dir = output_dir
@@ -17,22 +127,31 @@ class Download:
         self.uploads_dir = os.path.join(self.output_dir, "uploads")
         os.makedirs(self.uploads_dir, exist_ok=True)
 
-    def download_youtube_audio(self, url: str, temp_dir : str) -> str:
-        
-        cookie_file = os.path.join(Path(__file__).resolve().parents[1], 'cookie', 'cookies.txt')
-        if not os.path.exists(cookie_file):
-            raise FileNotFoundError(f"Cookie file not found at {cookie_file}")
+        self.cookie_file = os.path.join(Path(__file__).resolve().parents[1], 'cookie', 'cookies.txt')
 
-        logger.info(f"Cookie file : {cookie_file}")
-       
-        ydl_opts = {
+        # Idle, pre-configured YoutubeDL instances; all are dropped when the
+        # cookie file changes on disk so new ones load the fresh cookie jar.
+        self._pool: "queue.LifoQueue[yt_dlp.YoutubeDL]" = queue.LifoQueue()
+        self._pool_lock = threading.Lock()
+        self._cookie_mtime: Optional[float] = None
+        # cookie jar contents each pooled instance last loaded or saved
+        self._jar_saved: "weakref.WeakKeyDictionary[yt_dlp.YoutubeDL, frozenset]" = \
+            weakref.WeakKeyDictionary()
+
+        # Extracted video metadata, reused by the download of the same video
+        self._info_cache: TTLCache = TTLCache(maxsize=config.YTDLP_INFO_CACHE_SIZE,
+                                              ttl=config.YTDLP_INFO_CACHE_TTL_SECONDS)
+        REGISTRY.register_cache("ytdlp_info", self._info_cache.stats)
+
+    def _ydl_opts(self) -> dict:
+        return {
             'format': 'bestaudio[ext=m4a]/bestaudio/best',
-            'outtmpl': os.path.join(temp_dir, '%(id)s.%(ext)s'),
+            'outtmpl': '%(id)s.%(ext)s',          # directory comes from 'paths' per call
             'quiet': True,
             'no_warnings': True,
             'extract_flat': True,
             'force_generic_extractor': False,
-            'cookiefile': cookie_file if os.path.exists(cookie_file) else None,
+            'cookiefile': self.cookie_file if os.path.exists(self.cookie_file) else None,
             'http_headers': {
                 'User-Agent': 'Mozilla/5.0 (Macintosh; Intel Mac OS X 10_15_7) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36',
                 'Accept': 'text/html,application/xhtml+xml,application/xml;q=0.9,*/*;q=0.8',
@@ -41,29 +160,154 @@ class Download:
                 'Referer': 'https://www.youtube.com/'
             }
         }
-        
+
+    def _check_cookies(self) -> None:
+        """Raise if the cookie file is missing; reset the pool if it changed."""
+        try:
+            mtime = os.stat(self.cookie_file).st_mtime
+        except FileNotFoundError:
+            raise FileNotFoundError(f"Cookie file not found at {self.cookie_file}")
+        with self._pool_lock:
+            if mtime == self._cookie_mtime:
+                return
+            if self._cookie_mtime is not None:
+                logger.info(f"Cookie file changed, reloading : {self.cookie_file}")
+            stale, self._pool = self._pool, queue.LifoQueue()
+            self._cookie_mtime = mtime
+        while True:
+            try:
+                self._close(stale.get_nowait())
+            except queue.Empty:
+                break
+
+    @contextmanager
+    def _ydl(self, temp_dir: str) -> Iterator["yt_dlp.YoutubeDL"]:
+        """Borrow a pooled YoutubeDL that writes into *temp_dir*."""
+        pool = self._pool
+        try:
+            ydl = pool.get_nowait()
+        except queue.Empty:
+            logger.debug("Creating YoutubeDL instance")
+            ydl = yt_dlp.YoutubeDL(self._ydl_opts())
+            self._jar_saved[ydl] = self._jar_contents(ydl)
+        ydl.params['paths'] = {'home': temp_dir}
         try:
-            with yt_dlp.YoutubeDL(ydl_opts) as ydl:
-                # First try to extract info
+            yield ydl
+        finally:
+            self._save_cookies(ydl)
+            if pool is self._pool and pool.qsize() < config.YTDLP_POOL_SIZE:
+                pool.put(ydl)
+            else:
+                self._close(ydl)
+
+    @staticmethod
+    def _close(ydl: "yt_dlp.YoutubeDL") -> None:
+        """Release an instance's URL handlers without writing its (maybe stale) cookies."""
+        try:
+            ydl.params['cookiefile'] = None      # close() would save the jar otherwise
+            ydl.close()
+        except Exception as e:
+            logger.warning(f"Could not close YoutubeDL instance : {e}")
+
+    @staticmethod
+    def _jar_contents(ydl: "yt_dlp.YoutubeDL") -> frozenset:
+        return frozenset((c.domain, c.path, c.name, c.value, c.expires) for c in ydl.cookiejar)
+
+    def _save_cookies(self, ydl: "yt_dlp.YoutubeDL") -> None:
+        """
+        Persist cookies the site refreshed, unless the file was replaced
+        meanwhile. Unchanged jars are not written: every write changes the
+        file's mtime and makes the other workers rebuild their pools.
+        """
+        with self._pool_lock:
+            try:
+                contents = self._jar_contents(ydl)
+                if contents == self._jar_saved.get(ydl):
+                    return
+                if os.stat(self.cookie_file).st_mtime != self._cookie_mtime:
+                    return                       # new cookies on disk; don't clobber them
+                ydl.save_cookies()
+                self._jar_saved[ydl] = contents
+                self._cookie_mtime = os.stat(self.cookie_file).st_mtime
+            except Exception as e:
+                logger.warning(f"Could not save cookies : {e}")
+
+    def extract_info(self, url: str, ydl: Optional["yt_dlp.YoutubeDL"] = None) -> dict:
+        """Return video metadata for *url*, from the short-lived cache when fresh."""
+        key = youtube_video_id(url) or url
+        info = self._info_cache.get(key)
+        if info is not None:
+            logger.debug(f"Video metadata cache hit : {key}")
+            return info
+        with track_stage("ytdlp_metadata"):
+            if ydl is None:
+                with self._ydl(tempfile.gettempdir()) as ydl:
+                    info = ydl.extract_info(url, download=False)
+            else:
                 info = ydl.extract_info(url, download=False)
+        if info:
+            self._info_cache.set(key, info)
+        return info
+
+    def youtube_captions(self, url: str) -> Optional[dict]:
+        """
+        Return the video's captions in ``CAPTIONS_LANGUAGES`` as
+        ``{"text", "segments", "language", "kind"}``, or None if it has none.
+
+        Uses the cached metadata the audio download would use, so falling
+        back to the audio costs no second extraction.
+        """
+        self._check_cookies()
+        languages = [lang.strip() for lang in config.CAPTIONS_LANGUAGES.split(",") if lang.strip()]
+        try:
+            with track_stage("captions"):
+                info = self.extract_info(url)
+                if not info:
+                    return None
+                return fetch_captions(info, _shared_media_session(), languages,
+                                      allow_translated=config.CAPTIONS_ALLOW_TRANSLATED,
+                                      timeout=config.MEDIA_TIMEOUT_SECONDS)
+        except (yt_dlp.utils.DownloadError, requests.RequestException, ValueError) as e:
+            logger.warning(f"Captions unavailable, falling back to audio : {e}")
+            return None
+
+    @track_stage("download")
+    def download_youtube_audio(self, url: str, temp_dir : str,
+                               max_duration_minutes: Optional[int] = None) -> str:
+        max_duration_minutes = max_duration_minutes or MAX_DURATION_MINUTES
+
+        self._check_cookies()
+        cookie_file = self.cookie_file
+        logger.info(f"Cookie file : {cookie_file}")
+        
+        try:
+            with self._ydl(temp_dir) as ydl:
+                # Extract once; the download below reuses this metadata
+                info = self.extract_info(url, ydl)
                 
                 if not info:
                     raise BadRequest("Could not fetch video information")
                 
                 duration = info.get('duration', 0)
-                if duration > MAX_DURATION_MINUTES * 60:
-                    raise BadRequest(f"Video exceeds maximum duration of {MAX_DURATION_MINUTES} minutes")
+                if duration > max_duration_minutes * 60:
+                    raise BadRequest(f"Video exceeds maximum duration of {max_duration_minutes} minutes")
 
                 filesize = info.get('filesize', 0)
                 if filesize and filesize > MAX_FILE_SIZE_MB * 1024 * 1024:
                     raise BadRequest(f"File size exceeds {MAX_FILE_SIZE_MB}MB limit")
                 
-                # Now download
-                downloaded_info = ydl.extract_info(url, download=True)
+                # Now download from the already extracted info (no second page fetch).
+                # Cached format URLs can expire; in that case extract afresh once.
+                try:
+                    downloaded_info = ydl.process_ie_result(copy.deepcopy(info), download=True)
+                except yt_dlp.utils.DownloadError:
+                    self._info_cache.pop(youtube_video_id(url) or url)
+                    logger.warning("Download from cached metadata failed, extracting again")
+                    downloaded_info = ydl.extract_info(url, download=True)
                 
                 return ydl.prepare_filename(downloaded_info)  # download path
 
-        except DownloadError as e:
+        except yt_dlp.utils.DownloadError as e:
             error_msg = str(e).lower()
             logger.error(f"Youtube downloading failed : {error_msg}")
             if "private video" in error_msg:
@@ -78,4 +322,62 @@ class Download:
                 else:
                     raise BadRequest("Authentication failed. Server cookies may need to be updated.")
             else:
-                raise BadRequest(f"Failed to download video: {str(e)}")
\ No newline at end of file
+                raise BadRequest(f"Failed to download video: {str(e)}")
+
+    @track_stage("download")
+    def download_direct_audio(self, url: str, temp_dir: str,
+                              max_duration_minutes: Optional[int] = None) -> str:
+        """
+        Download a direct audio/video link (podcast MP3, media file…) into *temp_dir*.
+
+        The body is streamed to disk and ``MAX_FILE_SIZE_MB`` is enforced as
+        bytes arrive. Large files from servers that accept byte ranges are
+        fetched as ``MEDIA_RANGE_PARTS`` parallel range requests.
+        """
+        max_duration_minutes = max_duration_minutes or MAX_DURATION_MINUTES
+        max_bytes = MAX_FILE_SIZE_MB * 1024 * 1024
+        session = _shared_media_session()
+
+        try:
+            with session.get(url, stream=True, timeout=config.MEDIA_TIMEOUT_SECONDS) as resp:
+                resp.raise_for_status()
+                content_type = resp.headers.get('content-type', '').split(';')[0].strip().lower()
+                if content_type.startswith('text/') or content_type.endswith(('json', 'xml')):
+                    raise BadRequest(f"URL is not an audio or video file ({content_type})")
+
+                size = int(resp.headers.get('content-length') or 0)
+                if size > max_bytes:
+                    raise BadRequest(f"File size exceeds {MAX_FILE_SIZE_MB}MB limit")
+
+                final_url = resp.url
+                path = os.path.join(temp_dir, 'media' + _media_extension(final_url, content_type))
+                ranged = (config.MEDIA_RANGE_PARTS > 1
+                          and resp.headers.get('accept-ranges', '').lower() == 'bytes'
+                          and size >= config.MEDIA_RANGE_MIN_MB * 1024 * 1024)
+                if not ranged:
+                    written = _stream_to_file(resp, path, max_bytes)
+
+            if ranged:
+                try:
+                    _fetch_ranges(session, final_url, path, size, config.MEDIA_RANGE_PARTS)
+                    written = size
+                except _RangeNotSupported as e:
+                    logger.warning(f"Ranged download failed, streaming instead : {e}")
+                    with session.get(final_url, stream=True, timeout=config.MEDIA_TIMEOUT_SECONDS) as resp:
+                        resp.raise_for_status()
+                        written = _stream_to_file(resp, path, max_bytes)
+
+        except (requests.RequestException, OSError) as e:
+            logger.error(f"Media downloading failed : {e}")
+            raise BadRequest(f"Failed to download media: {e}")
+
+        logger.info(f"Downloaded {written} bytes of media{' in ranges' if ranged else ''} : {final_url}")
+
+        try:
+            duration = probe_duration(path)
+        except (ffmpeg.Error, OSError, ValueError) as e:
+            logger.warning(f"Could not probe media duration : {e}")
+        else:
+            if duration > max_duration_minutes * 60:
+                raise BadRequest(f"Media exceeds maximum duration of {max_duration_minutes} minutes")
+        return path
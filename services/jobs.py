@@ -0,0 +1,159 @@
+"""
+Background job execution for long-running requests.
+
+Jobs run on a bounded thread pool. Their state is kept in memory and mirrored
+to small JSON files under ``JOBS_DIR``, so any gunicorn worker can answer a
+status request for a job that another worker is running.
+"""
+import json
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import asdict, dataclass, field
+from typing import Any, Callable, Dict, Optional
+
+from werkzeug.exceptions import HTTPException, ServiceUnavailable
+
+from utils.config import config
+from utils.files import atomic_write_json
+from utils.logger import logger, request_id
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """State of one submitted job."""
+    job_id: str
+    kind: str
+    status: str = QUEUED
+    params: Dict[str, Any] = field(default_factory=dict)
+    result: Optional[Dict[str, Any]] = None
+    error: Optional[str] = None
+    error_code: Optional[int] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class JobManager:
+    """Run callables on a bounded worker pool and track them by job ID."""
+
+    def __init__(self, max_workers: Optional[int] = None, jobs_dir: Optional[str] = None):
+        self.max_workers = max(1, max_workers or config.JOB_WORKERS)
+        self.jobs_dir = jobs_dir or config.JOBS_DIR or os.path.join(os.getcwd(), 'data', 'jobs')
+        self._jobs: Dict[str, Job] = {}
+        self._lock = threading.Lock()
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._pid: Optional[int] = None
+
+    def _pool(self) -> ThreadPoolExecutor:
+        # a pool inherited through fork has no threads; build one per process
+        with self._lock:
+            if self._executor is None or self._pid != os.getpid():
+                self._executor = ThreadPoolExecutor(max_workers=self.max_workers,
+                                                    thread_name_prefix="job")
+                self._pid = os.getpid()
+            return self._executor
+
+    def submit(self, kind: str, fn: Callable[..., Dict[str, Any]], *args,
+               params: Optional[Dict[str, Any]] = None, **kwargs) -> Job:
+        """
+        Queue ``fn(*args, **kwargs)`` and return its job immediately.
+
+        Raises ``ServiceUnavailable`` when ``JOB_MAX_PENDING`` jobs are
+        already queued or running in this process.
+        """
+        job = Job(job_id=uuid.uuid4().hex, kind=kind, params=params or {})
+        with self._lock:
+            pending = sum(1 for j in self._jobs.values() if j.status in (QUEUED, RUNNING))
+            if 0 < config.JOB_MAX_PENDING <= pending:
+                logger.warning(f"Rejecting {kind} job, {pending} jobs pending")
+                raise ServiceUnavailable("Too many pending jobs, retry later",
+                                         retry_after=config.ADMISSION_RETRY_AFTER_SECONDS)
+            self._jobs[job.job_id] = job
+        self._save(job)
+        self._purge()
+        rid = request_id.get()
+        self._pool().submit(self._run, job, rid, fn, args, kwargs)
+        logger.info(f"Queued {kind} job {job.job_id}")
+        return job
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """Return the job from this process, or from the shared job files."""
+        with self._lock:
+            job = self._jobs.get(job_id)
+        if job is not None:
+            return job
+        path = self._path(job_id)
+        if not path or not os.path.exists(path):
+            return None
+        try:
+            with open(path, encoding="utf-8") as fh:
+                return Job(**json.load(fh))
+        except (OSError, ValueError, TypeError) as e:
+            logger.warning(f"Unreadable job file {path}: {e}")
+            return None
+
+    def _run(self, job: Job, rid: str, fn: Callable[..., Dict[str, Any]], args, kwargs) -> None:
+        token = request_id.set(rid)
+        job.status, job.started_at = RUNNING, time.time()
+        self._save(job)
+        try:
+            job.result = fn(*args, **kwargs)
+            job.status = SUCCEEDED
+        except HTTPException as e:
+            job.status, job.error, job.error_code = FAILED, e.description, e.code
+        except Exception as e:
+            logger.exception(f"{job.kind} job {job.job_id} failed")
+            job.status, job.error, job.error_code = FAILED, str(e), 500
+        finally:
+            job.finished_at = time.time()
+            self._save(job)
+            request_id.reset(token)
+        logger.info(f"{job.kind} job {job.job_id} {job.status} in "
+                    f"{job.finished_at - job.started_at:.1f}s")
+
+    def _path(self, job_id: str) -> Optional[str]:
+        if not job_id.isalnum():
+            return None
+        return os.path.join(self.jobs_dir, f"{job_id}.json")
+
+    def _save(self, job: Job) -> None:
+        """Write the job state atomically so readers never see a partial file."""
+        try:
+            atomic_write_json(self._path(job.job_id), job.as_dict())
+        except OSError as e:
+            logger.warning(f"Could not persist job {job.job_id}: {e}")
+
+    def _purge(self) -> None:
+        """Forget finished jobs older than ``JOB_RETENTION_SECONDS``."""
+        cutoff = time.time() - config.JOB_RETENTION_SECONDS
+        with self._lock:
+            expired = [j.job_id for j in self._jobs.values()
+                       if j.finished_at and j.finished_at < cutoff]
+            for job_id in expired:
+                del self._jobs[job_id]
+        try:
+            entries = os.scandir(self.jobs_dir)
+        except OSError:
+            return
+        with entries:
+            for entry in entries:
+                try:
+                    if entry.name.endswith(".json") and entry.stat().st_mtime < cutoff:
+                        os.remove(entry.path)
+                except OSError:
+                    pass
+
+
+# Create a singleton instance
+job_manager = JobManager()
@@ -0,0 +1,182 @@
+"""
+In-memory cache of the most recently published news items.
+
+Every RSS ingest offers its parsed rows to a :class:`RecentItems` collector,
+which keeps only the newest ``NEWS_CACHE_SIZE`` of them by publication date.
+When the ingest succeeds they are merged into :data:`news_cache`, which builds
+a new immutable :class:`NewsSnapshot` (indexed by item_id, category and
+publication date) and swaps it in, so reads never take a lock.
+
+The snapshot is also written to ``NEWS_CACHE_PATH``. Other worker processes
+notice the new file on their next read and load it, so every worker serves
+the same items with the same ``ETag``, and a restarted worker is warm before
+the next refresh.
+"""
+import hashlib
+import heapq
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right
+from email.utils import parsedate_to_datetime
+from itertools import count
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.config import config
+from utils.files import atomic_write_json
+from utils.logger import logger
+
+
+def pub_timestamp(pub_date: Optional[str]) -> float:
+    """Parse an RFC 822 ``pubDate`` to a UNIX timestamp (0 when missing or invalid)."""
+    if not pub_date:
+        return 0.0
+    try:
+        return parsedate_to_datetime(pub_date).timestamp()
+    except (TypeError, ValueError):
+        return 0.0
+
+
+class RecentItems:
+    """Bounded collector of the newest rows seen during one ingest."""
+
+    def __init__(self, capacity: Optional[int] = None):
+        self.capacity = capacity if capacity is not None else config.NEWS_CACHE_SIZE
+        self._heap: List[Tuple[float, int, Dict[str, Any]]] = []     # min-heap on pub date
+        self._seq = count()
+
+    def add(self, rows: Iterable[Dict[str, Any]]) -> None:
+        if self.capacity <= 0:
+            return
+        for row in rows:
+            entry = (pub_timestamp(row.get("pub_date")), next(self._seq), row)
+            if len(self._heap) < self.capacity:
+                heapq.heappush(self._heap, entry)
+            elif entry[0] > self._heap[0][0]:
+                heapq.heapreplace(self._heap, entry)
+
+    def rows(self) -> List[Dict[str, Any]]:
+        return [row for _, _, row in self._heap]
+
+
+class _Index:
+    """Items in newest-first order with their negated timestamps, for bisecting date ranges."""
+
+    def __init__(self, items: List[Dict[str, Any]], timestamps: List[float]):
+        self.items = items
+        self._keys = [-ts for ts in timestamps]
+
+    def between(self, since: Optional[float], until: Optional[float]) -> List[Dict[str, Any]]:
+        lo = 0 if until is None else bisect_left(self._keys, -until)
+        hi = len(self._keys) if since is None else bisect_right(self._keys, -since)
+        return self.items[lo:hi]
+
+
+class NewsSnapshot:
+    """Immutable, indexed view of the cached items."""
+
+    def __init__(self, items: List[Dict[str, Any]], etag: Optional[str] = None):
+        ordered = sorted(((pub_timestamp(item.get("pub_date")), item) for item in items),
+                         key=lambda pair: (pair[0], str(pair[1].get("item_id"))), reverse=True)
+        self.items = [item for _, item in ordered]
+        self.etag = etag or self._digest(self.items)
+        self.by_id = {str(item.get("item_id")): item for item in self.items}
+        self.all = _Index(self.items, [ts for ts, _ in ordered])
+
+        grouped: Dict[str, Tuple[List[Dict[str, Any]], List[float]]] = {}
+        for ts, item in ordered:
+            items_, stamps = grouped.setdefault((item.get("category") or "").casefold(), ([], []))
+            items_.append(item)
+            stamps.append(ts)
+        self.by_category = {name: _Index(*lists) for name, lists in grouped.items()}
+
+    @staticmethod
+    def _digest(items: List[Dict[str, Any]]) -> str:
+        payload = json.dumps(items, sort_keys=True, ensure_ascii=False, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()[:32]
+
+    def categories(self) -> List[str]:
+        return sorted({item.get("category") for item in self.items if item.get("category")})
+
+    def query(self,
+              category: Optional[str] = None,
+              since: Optional[float] = None,
+              until: Optional[float] = None) -> List[Dict[str, Any]]:
+        """Items newest first, optionally of one *category* and published within [*since*, *until*]."""
+        index = self.all if category is None else self.by_category.get(category.casefold())
+        return index.between(since, until) if index is not None else []
+
+
+class NewsCache:
+    """Latest ``NEWS_CACHE_SIZE`` items, shared by the worker processes through a snapshot file."""
+
+    def __init__(self, path: Optional[str] = None, capacity: Optional[int] = None):
+        self.path = path or config.NEWS_CACHE_PATH or os.path.join(os.getcwd(), 'data', 'news_cache.json')
+        self.capacity = capacity if capacity is not None else config.NEWS_CACHE_SIZE
+        self._snapshot = NewsSnapshot([])
+        self._file_stamp: Optional[Tuple[int, int]] = None
+        self._lock = threading.Lock()
+
+    def _stamp(self) -> Optional[Tuple[int, int]]:
+        try:
+            st = os.stat(self.path)
+        except OSError:
+            return None
+        return st.st_mtime_ns, st.st_size
+
+    def snapshot(self) -> NewsSnapshot:
+        """Current snapshot, reloaded first if another process has published a newer one."""
+        stamp = self._stamp()
+        if stamp is not None and stamp != self._file_stamp:
+            with self._lock:
+                if stamp != self._file_stamp:
+                    self._load(stamp)
+        return self._snapshot
+
+    def _load(self, stamp: Tuple[int, int]) -> None:
+        try:
+            with open(self.path, encoding="utf-8") as fh:
+                data = json.load(fh)
+            self._snapshot = NewsSnapshot(data["items"], etag=data.get("etag"))
+            logger.debug(f"Loaded {len(self._snapshot.items)} cached news items from {self.path}")
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            logger.warning(f"Ignoring unreadable news cache {self.path} : {e}")
+        self._file_stamp = stamp
+
+    def publish(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """
+        Merge freshly ingested *rows* into the cache (a row replaces the cached
+        item with the same item_id), keep the newest ``capacity`` and swap in
+        the new snapshot.
+        """
+        rows = [row for row in rows if row.get("item_id")]
+        if not rows or self.capacity <= 0:
+            return
+        self.snapshot()                          # start from what other workers published
+        with self._lock:
+            merged = dict(self._snapshot.by_id)
+            merged.update((str(row["item_id"]), row) for row in rows)
+            newest = heapq.nlargest(self.capacity, merged.values(),
+                                    key=lambda item: pub_timestamp(item.get("pub_date")))
+            snapshot = NewsSnapshot(newest)
+            if snapshot.etag == self._snapshot.etag:
+                return
+            self._snapshot = snapshot
+            self._file_stamp = self._write(snapshot)
+        logger.info(f"News cache refreshed : {len(snapshot.items)} items, etag {snapshot.etag}")
+
+    def _write(self, snapshot: NewsSnapshot) -> Optional[Tuple[int, int]]:
+        try:
+            atomic_write_json(self.path, {"etag": snapshot.etag, "items": snapshot.items})
+        except OSError as e:
+            logger.warning(f"Could not write news cache {self.path} : {e}")
+            return self._file_stamp
+        return self._stamp()
+
+    def stats(self) -> Dict[str, Any]:
+        snapshot = self._snapshot
+        return {"items": len(snapshot.items), "capacity": self.capacity, "etag": snapshot.etag}
+
+
+# Create a singleton instance
+news_cache = NewsCache()
@@ -0,0 +1,242 @@
+"""
+URL helpers: redirect resolution and YouTube URL canonicalization.
+"""
+import html
+import re
+import threading
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+from typing import Any, Dict, Iterable, List, Optional
+from urllib.parse import urlparse, urljoin, parse_qs, urlencode, urlunparse
+from utils.cache import TTLCache
+from utils.config import config
+from utils.metrics import REGISTRY, track_stage
+
+META_REFRESH_RE = re.compile(
+    r'<meta[^>]+http-equiv=["\']?refresh["\']?[^>]*content=["\']?\s*\d+\s*;\s*url=(.*?)["\'>]',
+    re.IGNORECASE
+)
+
+def _follow_meta_refresh(html_text: str, base_url: str) -> Optional[str]:
+    """
+    Look for <meta http-equiv="refresh" …> and return the absolute URL, or None.
+    """
+    match = META_REFRESH_RE.search(html_text)
+    if not match:
+        return None
+    target = html.unescape(match.group(1).strip())
+    return urljoin(base_url, target)
+
+_USER_AGENT = {"User-Agent": "python-redirect-check/1.0"}
+
+_sessions: Dict[int, requests.Session] = {}      # one pooled session per redirect limit
+_session_lock = threading.Lock()
+
+# final URLs (or the failure a resolution raised), keyed by request options
+_resolved: TTLCache = TTLCache(maxsize=config.RESOLVE_CACHE_SIZE,
+                               ttl=config.RESOLVE_CACHE_TTL_SECONDS)
+REGISTRY.register_cache("resolve", _resolved.stats)
+
+
+class _Failure:
+    """
+    Negative cache entry: type and message of the exception a resolution
+    raised. Each hit raises a new instance, so concurrent callers don't share
+    (and keep growing) one traceback.
+    """
+    __slots__ = ("exc_type", "message")
+
+    def __init__(self, exc: Exception):
+        self.exc_type = type(exc)
+        self.message = str(exc)
+
+
+def _shared_session(max_hops: int) -> requests.Session:
+    """Return the process-wide pooled session that follows up to *max_hops* redirects."""
+    session = _sessions.get(max_hops)
+    if session is None:
+        with _session_lock:
+            session = _sessions.get(max_hops)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=config.RESOLVE_POOL_SIZE,
+                                      pool_maxsize=config.RESOLVE_POOL_SIZE)
+                session.mount("http://", adapter)
+                session.mount("https://", adapter)
+                session.headers.update(_USER_AGENT)
+                session.max_redirects = max_hops
+                _sessions[max_hops] = session
+    return session
+
+def _read_prefix(resp: requests.Response, limit: int) -> str:
+    """Read at most *limit* bytes of a streamed body and decode them."""
+    chunks, size = [], 0
+    for chunk in resp.iter_content(chunk_size=8192):
+        chunks.append(chunk)
+        size += len(chunk)
+        if size >= limit:
+            break
+    return b"".join(chunks)[:limit].decode(resp.encoding or "utf-8", errors="replace")
+
+def resolve_url(url: str,
+                *,
+                timeout: float = 10.0,
+                max_hops: int = 10,
+                follow_meta: bool = False,
+                use_cache: bool = True) -> str:
+    """
+    Return the final landing URL after following up to `max_hops` redirects.
+
+    Parameters
+    ----------
+    url : str
+        The starting URL.
+    timeout : float, default 10 s
+        Network timeout for each request.
+    max_hops : int, default 10
+        Safety limit to avoid redirect loops.
+    follow_meta : bool, default False
+        Also chase HTML meta-refresh redirects (one extra GET at most).
+    use_cache : bool, default True
+        Serve repeated URLs from the in-process cache. Successes are kept for
+        ``RESOLVE_CACHE_TTL_SECONDS`` and failures for
+        ``RESOLVE_NEGATIVE_TTL_SECONDS``.
+    """
+    key = (url, max_hops, follow_meta)
+    if use_cache:
+        cached = _resolved.get(key)
+        if isinstance(cached, _Failure):
+            raise cached.exc_type(cached.message)
+        if cached is not None:
+            return cached
+
+    try:
+        with track_stage("resolve"):
+            final_url = _resolve(url, timeout=timeout, max_hops=max_hops, follow_meta=follow_meta)
+    except requests.exceptions.RequestException as e:
+        if use_cache:
+            _resolved.set(key, _Failure(e), ttl=config.RESOLVE_NEGATIVE_TTL_SECONDS)
+        raise
+    if use_cache:
+        _resolved.set(key, final_url)
+    return final_url
+
+def _resolve(url: str, *, timeout: float, max_hops: int, follow_meta: bool) -> str:
+    """Uncached redirect chasing behind :func:`resolve_url`."""
+    session = _shared_session(max_hops)
+
+    try:
+        # Try HEAD first – it’s lighter, but some sites forbid it.
+        resp = session.head(url,
+                            allow_redirects=True,
+                            timeout=timeout)
+        resp.close()
+        final_url = resp.url
+        if resp.is_redirect:               # still in a redirect chain
+            final_url = resp.headers["Location"]
+        is_html = "text/html" in resp.headers.get("content-type", "")
+        page = None
+    except requests.exceptions.RequestException:
+        # Fall back to GET (handles sites that disallow HEAD); stream it so
+        # only the part needed to spot a meta refresh is ever read
+        with session.get(url, allow_redirects=True, timeout=timeout, stream=True) as resp:
+            final_url = resp.url
+            is_html = "text/html" in resp.headers.get("content-type", "")
+            page = (_read_prefix(resp, config.RESOLVE_MAX_BODY_BYTES)
+                    if follow_meta and resp.ok and is_html else None)
+
+    # Optional: follow one level of <meta http-equiv="refresh"> in the landing page
+    if follow_meta and resp.ok and is_html:
+        if page is None:
+            try:
+                with session.get(final_url, allow_redirects=True, timeout=timeout,
+                                 stream=True) as landing:
+                    page = _read_prefix(landing, config.RESOLVE_MAX_BODY_BYTES)
+            except requests.exceptions.RequestException:
+                page = ""
+        next_url = _follow_meta_refresh(page, final_url)
+        if next_url:
+            # one extra request to verify (avoids infinite loops)
+            try:
+                with session.get(next_url,
+                                 allow_redirects=True,
+                                 timeout=timeout,
+                                 stream=True) as resp:
+                    final_url = resp.url
+            except requests.exceptions.RequestException:
+                pass
+
+    return final_url
+
+def resolve_urls(urls: Iterable[str], **kwargs: Any) -> List[Dict[str, str]]:
+    """
+    Resolve many URLs concurrently (``RESOLVE_CONCURRENCY`` at a time).
+
+    Returns one ``{"url", "final_url"}`` or ``{"url", "error"}`` entry per
+    input, in input order; duplicates are resolved once.
+    """
+    urls = list(urls)
+    unique = list(dict.fromkeys(urls))
+    outcomes: Dict[str, Dict[str, str]] = {}
+
+    def _one(u: str) -> Dict[str, str]:
+        try:
+            return {"url": u, "final_url": resolve_url(u, **kwargs)}
+        except Exception as e:
+            return {"url": u, "error": str(e)}
+
+    workers = max(1, min(config.RESOLVE_CONCURRENCY, len(unique)))
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="resolve") as pool:
+        for outcome in pool.map(_one, unique):
+            outcomes[outcome["url"]] = outcome
+    return [outcomes[u] for u in urls]
+
+def canonical_youtube_url(url: str, keep_params=('v',)) -> str:
+    """
+    Return a cleaned-up YouTube URL that keeps only the query
+    parameters listed in *keep_params* (defaults to just 'v').
+    
+    Examples
+    --------
+    >>> canonical_youtube_url(
+    ...     "https://www.youtube.com/watch?v=JiJeZOHx0ow&pp=0gcJCdgAo7VqN5tD")
+    'https://www.youtube.com/watch?v=JiJeZOHx0ow'
+    
+    >>> canonical_youtube_url(
+    ...     "https://youtu.be/JiJeZOHx0ow?t=60", keep_params=())
+    'https://youtu.be/JiJeZOHx0ow'
+    """
+    parsed = urlparse(url)
+    
+    # Short youtu.be links rarely need any changes—just drop the query/fragment.
+    if parsed.netloc.endswith("youtu.be"):
+        return f"https://{parsed.netloc}{parsed.path}"
+    
+    # Long form: https://www.youtube.com/watch?v=...
+    if parsed.netloc.endswith("youtube.com") and parsed.path == "/watch":
+        qs = parse_qs(parsed.query)
+        # Retain only the desired parameters (order-preserving).
+        new_qs = [(k, v) for k, vs in qs.items() for v in vs if k in keep_params]
+        new_query = urlencode(new_qs, doseq=True)
+        cleaned = parsed._replace(query=new_query, fragment="")
+        return urlunparse(cleaned)
+    
+    # Anything else: return untouched.
+    return url
+
+def youtube_video_id(url: str) -> Optional[str]:
+    """
+    Return the video ID of a YouTube watch or youtu.be URL, or None.
+
+    >>> youtube_video_id("https://www.youtube.com/watch?v=JiJeZOHx0ow&t=60")
+    'JiJeZOHx0ow'
+    >>> youtube_video_id("https://youtu.be/JiJeZOHx0ow")
+    'JiJeZOHx0ow'
+    """
+    parsed = urlparse(url)
+    if parsed.netloc.endswith("youtu.be"):
+        return parsed.path.strip("/").split("/")[0] or None
+    if parsed.netloc.endswith("youtube.com") and parsed.path == "/watch":
+        return (parse_qs(parsed.query).get("v") or [None])[0]
+    return None
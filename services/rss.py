@@ -0,0 +1,537 @@
+"""
+RSS feed fetching, parsing and ingestion.
+
+The fetcher remembers, per feed URL, the ``ETag``/``Last-Modified`` validators
+and a hash of the last body that was fully processed, so unchanged feeds can be
+skipped before parsing or touching the database. The parser walks the document
+with ``iterparse`` and yields one item at a time. The newest items of every
+successful ingest are published to ``news_cache`` for the ``/news`` endpoint.
+"""
+import asyncio
+import hashlib
+import io
+import json
+import os
+import threading
+import time
+import xml.etree.ElementTree as ET
+from dataclasses import dataclass
+from functools import lru_cache
+from itertools import islice
+from pathlib import Path
+from typing import Any, Awaitable, BinaryIO, Callable, Dict, Iterable, Iterator, List, Optional, Tuple, TypeVar, Union
+from urllib.parse import urlparse
+
+import httpx
+
+try:
+    import fcntl
+except ImportError:                     # Windows: runs are coalesced per process only
+    fcntl = None
+
+from services.news_cache import RecentItems, news_cache
+from services.rss_index import row_hash, seen_index
+from services.supabase import DBConnection
+from utils.config import config
+from utils.files import atomic_write_json
+from utils.logger import logger
+from utils.metrics import DOWNLOADED_BYTES, observe_stage, track_stage
+
+# Per-item lines; sample them with LOG_SAMPLE_RATES="util-service.rss.items=…"
+item_logger = logger.getChild("rss.items")
+
+
+@dataclass
+class FeedState:
+    """Validators and body hash of the last successfully processed fetch."""
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+
+
+@dataclass
+class FetchResult:
+    """Outcome of a conditional feed fetch."""
+    url: str
+    status: int
+    content: Optional[bytes] = None
+    etag: Optional[str] = None
+    last_modified: Optional[str] = None
+    body_hash: Optional[str] = None
+    unchanged: bool = False
+
+
+class FeedFetcher:
+    """Conditional GET client that tracks per-URL feed state in memory."""
+
+    def __init__(self):
+        self._states: Dict[str, FeedState] = {}
+        self._lock = threading.Lock()
+
+    def state(self, url: str) -> FeedState:
+        """Return the last processed state for *url* (empty if never seen)."""
+        with self._lock:
+            return self._states.get(url) or FeedState()
+
+    async def fetch(self,
+                    client: httpx.AsyncClient,
+                    url: str,
+                    *,
+                    force: bool = False) -> FetchResult:
+        """
+        GET *url*, sending ``If-None-Match``/``If-Modified-Since`` from the
+        last processed fetch.
+
+        The result is marked ``unchanged`` on a 304 or when the body hash
+        matches the last processed body. ``force`` skips both checks.
+        """
+        state = FeedState() if force else self.state(url)
+        headers = {}
+        if state.etag:
+            headers["If-None-Match"] = state.etag
+        if state.last_modified:
+            headers["If-Modified-Since"] = state.last_modified
+
+        with track_stage("rss_fetch"):
+            r = await client.get(url, headers=headers)
+        DOWNLOADED_BYTES.inc(len(r.content), source="rss")
+        if r.status_code == 304:
+            logger.info(f"Feed not modified (304): {url}")
+            return FetchResult(url=url, status=304, etag=state.etag,
+                               last_modified=state.last_modified,
+                               body_hash=state.body_hash, unchanged=True)
+        r.raise_for_status()
+
+        body_hash = hashlib.sha256(r.content).hexdigest()
+        result = FetchResult(url=url,
+                             status=r.status_code,
+                             content=r.content,
+                             etag=r.headers.get("ETag"),
+                             last_modified=r.headers.get("Last-Modified"),
+                             body_hash=body_hash)
+        if state.body_hash == body_hash:
+            logger.info(f"Feed body unchanged (sha256 {body_hash[:12]}): {url}")
+            result.unchanged = True
+        return result
+
+    def mark_processed(self, result: FetchResult) -> None:
+        """
+        Remember *result* as the last processed fetch of its URL.
+
+        Call this only after the items were written, so a failed run is
+        retried in full on the next poll instead of being short-circuited.
+        """
+        with self._lock:
+            self._states[result.url] = FeedState(etag=result.etag,
+                                                 last_modified=result.last_modified,
+                                                 body_hash=result.body_hash)
+
+
+# Create a singleton instance
+feed_fetcher = FeedFetcher()
+
+
+# ——— parsing ——————————————————————————————————————————————————————————
+T = TypeVar("T")
+
+
+@lru_cache(maxsize=1024)
+def _strip_ns(tag: str) -> str:
+    """Remove XML namespace from a tag (memoized: feeds reuse a handful of tags)."""
+    return tag.rpartition("}")[2]
+
+
+def iter_items(source: Union[str, Path, BinaryIO]) -> Iterator[Dict[str, str]]:
+    """
+    Yield every ``<item>`` of an RSS document as ``{tag: text}``.
+
+    *source* is a file path or a binary file object. Elements are parsed
+    incrementally and each finished item is detached from the tree, so memory
+    stays bounded by the size of a single item.
+    """
+    parents: List[ET.Element] = []
+    for event, elem in ET.iterparse(source, events=("start", "end")):
+        if event == "start":
+            parents.append(elem)
+            continue
+        parents.pop()
+        if _strip_ns(elem.tag) != "item":
+            continue
+        yield {_strip_ns(c.tag): (c.text or "").strip() for c in elem}
+        elem.clear()
+        if parents:
+            parents[-1].remove(elem)
+
+
+def item_to_row(item: Dict[str, str]) -> Dict[str, Optional[str]]:
+    """Map a parsed feed item to an ``rss_feed`` table row."""
+    return {
+            "item_id":          item.get("itemID"),
+            "title":            item.get("title"),
+            "link":             item.get("link"),
+            "photographer":     item.get("Photographer"),
+            "pub_date":         item.get("pubDate"),     # consider parsing to datetime
+            "description":      item.get("description"),
+            "content":          item.get("encoded"),
+            "dcterms_modified": item.get("modified"),
+            "is_video":         item.get("isVideo"),
+            "dc_creator":       item.get("creator"),
+            "media_keywords":   item.get("keywords"),
+            "category":         item.get("category"),
+    }
+
+
+def batched(iterable: Iterable[T], size: int) -> Iterator[List[T]]:
+    """Yield lists of up to *size* elements from *iterable*."""
+    it = iter(iterable)
+    while batch := list(islice(it, size)):
+        yield batch
+
+
+# ——— ingestion ————————————————————————————————————————————————————————
+def _guid_key(val: str) -> Union[str, int]:
+    """
+    Choose the best sortable key for a guid:
+    • If it's all digits → return int(val)
+    • else → return the raw string (lexicographic sort)
+    """
+    return int(val) if val and val.isdigit() else val
+
+
+def _as_feed_row(stored: Dict[str, Any], like: Dict[str, Any]) -> Dict[str, Optional[str]]:
+    """Project a database row onto *like*'s keys, with values as ``item_to_row`` builds them."""
+    return {key: None if stored.get(key) is None else str(stored[key]) for key in like}
+
+
+async def _check_stored(db: DBConnection, rows: List[Dict[str, str]]
+                        ) -> Tuple[List[Dict[str, str]], List[Dict[str, str]], List[Dict[str, str]]]:
+    """
+    Split rows the seen-index does not know into ``(new, changed, unchanged)``
+    against what the database already holds.
+
+    The index lives on local disk and starts empty after a redeploy; without
+    this, every stored item would be sent as an ignored duplicate and its
+    hash recorded, so edits made meanwhile would never be written.
+    """
+    if not rows:
+        return [], [], []
+    await db.initialize()
+    stored = {str(row["item_id"]): row for row in await db.select_in(
+        'rss_feed', 'item_id', [row["item_id"] for row in rows],
+        chunk_size=config.RSS_UPSERT_CHUNK_SIZE, concurrency=config.RSS_UPSERT_CONCURRENCY)}
+    new, changed, unchanged = [], [], []
+    for row in rows:
+        current = stored.get(str(row["item_id"]))
+        if current is None:
+            new.append(row)
+        elif row_hash(_as_feed_row(current, row)) == row_hash(row):
+            unchanged.append(row)
+        else:
+            changed.append(row)
+    if stored:
+        logger.info(f"Index : {len(stored)} unindexed items already stored, {len(changed)} of them edited")
+    return new, changed, unchanged
+
+
+async def _write_rows(db: DBConnection, rows: List[Dict[str, str]]) -> Dict[str, int]:
+    """Send the new and edited *rows* to Supabase and return per-batch counts."""
+
+    # ---- one row per item_id; a batch must not carry the same key twice ----
+    unique = {row["item_id"]: row for row in rows}
+
+    # ---- only new or edited items go to the database ----
+    if config.RSS_INDEX_ENABLED:
+        new_rows, changed_rows, unchanged = seen_index.classify(unique.values())
+        new_rows, stored_changed, stored_unchanged = await _check_stored(db, new_rows)
+        changed_rows += stored_changed
+        unchanged += len(stored_unchanged)
+    else:
+        new_rows, changed_rows, unchanged = list(unique.values()), [], 0
+    logger.info(f"Index : {len(new_rows)} new, {len(changed_rows)} changed, {unchanged} unchanged")
+
+    inserted: List[Dict[str, str]] = []
+    if new_rows or changed_rows:
+        await db.initialize()
+        inserted = await db.upsert_batched(
+                        'rss_feed',
+                        new_rows,
+                        on_conflict="item_id",
+                        ignore_duplicates=True,
+                        chunk_size=config.RSS_UPSERT_CHUNK_SIZE,
+                        concurrency=config.RSS_UPSERT_CONCURRENCY,
+                        )
+        await db.upsert_batched(
+                        'rss_feed',
+                        changed_rows,
+                        on_conflict="item_id",
+                        chunk_size=config.RSS_UPSERT_CHUNK_SIZE,
+                        concurrency=config.RSS_UPSERT_CONCURRENCY,
+                        )
+
+        for row in inserted:                    #  ← only rows that were really inserted come back
+            item_logger.debug("Inserted item_id=%s", row['item_id'])
+
+    if config.RSS_INDEX_ENABLED:
+        seen_index.record(new_rows + changed_rows + stored_unchanged)
+    return {"items": len(unique), "inserted": len(inserted), "updated": len(changed_rows),
+            "skipped": len(new_rows) - len(inserted), "unchanged": unchanged}
+
+
+# (feed URL, force) -> the ingestion currently running for it on this loop
+_inflight_feeds: Dict[Tuple[str, bool], "asyncio.Task[Dict[str, Any]]"] = {}
+
+
+async def update_rss(source: Union[str, Path],
+              sort_key: Callable[[str], Union[str, int]] = _guid_key,
+              descending: bool = False,
+              force: bool = False,
+              stream: Optional[bool] = None,
+              client: Optional[httpx.AsyncClient] = None) -> Dict[str, int]:
+    """
+    Parse *source*, upsert its items sorted by guid and return insert counts.
+
+    Overlapping calls for the same remote feed (e.g. ``/update-rss`` while the
+    scheduler is polling) share one run; the callers that joined it get its
+    counts with ``coalesced: True``. Within a process they join the running
+    task; across worker processes they wait on the feed's file lock and pick
+    up the counts the lock holder left behind.
+
+    Remote feeds are fetched conditionally; when the feed is unchanged since
+    the last processed run, parsing and database writes are skipped entirely
+    (unless *force* is set).
+
+    With *stream* (default ``RSS_STREAM_PARSE``) items are not sorted: they
+    flow from the parser to the database in windows of
+    ``RSS_UPSERT_CHUNK_SIZE * RSS_UPSERT_CONCURRENCY`` rows, so memory stays
+    bounded for very large feeds and archive backfills.
+
+    Remote feeds are fetched with *client* when given (it is left open), so
+    callers ingesting many feeds can share one connection pool. The database
+    client is the warm per-process ``DBConnection`` and is never closed here.
+    """
+    if not str(source).startswith(("http://", "https://")):
+        return await _update_rss(source, sort_key, descending, force, stream, client)
+
+    key = (str(source), force)
+    task = _inflight_feeds.get(key)
+    if task is not None and not task.done() and task.get_loop() is asyncio.get_running_loop():
+        logger.info(f"Joining in-flight RSS update of {source}")
+        return {**await asyncio.shield(task), "coalesced": True}
+
+    task = asyncio.ensure_future(_update_rss_across_workers(
+        str(source), force, lambda: _update_rss(source, sort_key, descending, force, stream, client)))
+    _inflight_feeds[key] = task
+    task.add_done_callback(lambda t: _inflight_feeds.pop(key) if _inflight_feeds.get(key) is t else None)
+    return await asyncio.shield(task)
+
+
+FEED_LOCK_POLL_SECONDS = 0.2
+
+
+def _feed_lock_path(url: str, force: bool) -> str:
+    directory = config.RSS_FEED_LOCK_DIR or os.path.join(os.getcwd(), 'data', 'rss_locks')
+    digest = hashlib.sha256(f"{url}|{force}".encode("utf-8")).hexdigest()[:24]
+    return os.path.join(directory, f"{digest}.lock")
+
+
+def _read_run_result(path: str, since: float) -> Optional[Dict[str, Any]]:
+    """Counts of a run that finished after *since*, or None."""
+    try:
+        with open(path, encoding="utf-8") as fh:
+            entry = json.load(fh)
+    except (OSError, ValueError):
+        return None
+    return entry["result"] if entry.get("finished_at", 0) >= since else None
+
+
+def _write_run_result(path: str, result: Dict[str, Any]) -> None:
+    try:
+        atomic_write_json(path, {"finished_at": time.time(), "result": result})
+    except OSError as e:
+        logger.warning(f"Could not record RSS run result {path} : {e}")
+
+
+async def _update_rss_across_workers(url: str,
+                                     force: bool,
+                                     run: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+    """
+    Call *run* holding the feed's lock file. A process that finds the lock
+    taken waits for it and returns the holder's counts with
+    ``coalesced: True``; if the holder failed, it runs the update itself.
+    """
+    if fcntl is None:
+        return await run()
+    lock_path = _feed_lock_path(url, force)
+    result_path = f"{lock_path}.json"
+    os.makedirs(os.path.dirname(lock_path), exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+    try:
+        waiting_since = None
+        while True:
+            try:
+                fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                break
+            except OSError:
+                if waiting_since is None:
+                    waiting_since = time.time()
+                    logger.info(f"Waiting for another worker's RSS update of {url}")
+                await asyncio.sleep(FEED_LOCK_POLL_SECONDS)
+        if waiting_since is not None:
+            result = _read_run_result(result_path, waiting_since)
+            if result is not None:
+                return {**result, "coalesced": True}
+        result = await run()
+        _write_run_result(result_path, result)
+        return result
+    finally:
+        os.close(fd)                      # releases the lock
+
+
+async def _update_rss(source: Union[str, Path],
+                      sort_key: Callable[[str], Union[str, int]],
+                      descending: bool,
+                      force: bool,
+                      stream: Optional[bool],
+                      client: Optional[httpx.AsyncClient]) -> Dict[str, int]:
+    """Uncoalesced body of :func:`update_rss`."""
+    stream = config.RSS_STREAM_PARSE if stream is None else stream
+    fetched = None
+    if str(source).startswith(("http://", "https://")):
+        if client is None:
+            async with httpx.AsyncClient(timeout=20) as own_client:
+                fetched = await feed_fetcher.fetch(own_client, source, force=force)
+        else:
+            fetched = await feed_fetcher.fetch(client, source, force=force)
+        if fetched.unchanged:
+            feed_fetcher.mark_processed(fetched)     # keep any fresh validators
+            return {"items": 0, "inserted": 0, "updated": 0, "skipped": 0,
+                    "unchanged": 0, "not_modified": True}
+        xml_source = io.BytesIO(fetched.content)
+    else:                                        # treat as local file
+        xml_source = source
+
+    parse_started = time.perf_counter()
+    items = iter_items(xml_source)
+    if not stream:
+        # ---- sort by guid ----
+        items = sorted(items, key=lambda d: sort_key(d.get("guid", "")), reverse=descending)
+        logger.info(f"News Count : {len(items)}")
+    rows = (item_to_row(item) for item in items)
+    parse_seconds = time.perf_counter() - parse_started
+
+    totals = {"items": 0, "inserted": 0, "updated": 0, "skipped": 0, "unchanged": 0}
+    recent = RecentItems() if config.NEWS_CACHE_ENABLED else None
+    window = max(1, config.RSS_UPSERT_CHUNK_SIZE) * max(1, config.RSS_UPSERT_CONCURRENCY)
+    try : 
+        # Initialize database lazily: nothing connects unless a batch has work
+        db = DBConnection()
+        logger.info(f"Updating Database...")
+        batches = batched(rows, window)
+        while True:
+            # parsing is lazy in stream mode, so it is timed batch by batch
+            pulled = time.perf_counter()
+            batch = next(batches, None)
+            parse_seconds += time.perf_counter() - pulled
+            if batch is None:
+                break
+            if recent is not None:
+                recent.add(batch)
+            with track_stage("rss_upsert"):
+                counts = await _write_rows(db, batch)
+            for key, value in counts.items():
+                totals[key] += value
+        observe_stage("rss_parse", parse_seconds)
+
+        logger.info(f"Updated Database : {totals['inserted']} inserted, {totals['updated']} updated, "
+                    f"{totals['skipped']} skipped, {totals['unchanged']} unchanged")
+
+        if fetched is not None:
+            feed_fetcher.mark_processed(fetched)
+        if recent is not None:
+            news_cache.publish(recent.rows())
+        return totals
+    
+    except Exception as e :
+        logger.error(f"Supabase Database Initialization failed : {e}")
+        raise
+
+
+_feed_client: Optional[httpx.AsyncClient] = None
+_feed_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _shared_client() -> httpx.AsyncClient:
+    """
+    Return the pooled feed client for the running loop.
+
+    It is created on first use and kept for the lifetime of the loop, so
+    keep-alive connections and TLS sessions carry over between refreshes.
+    """
+    global _feed_client, _feed_client_loop
+    loop = asyncio.get_running_loop()
+    if _feed_client is None or _feed_client_loop is not loop or _feed_client.is_closed:
+        limits = httpx.Limits(max_connections=max(1, config.RSS_MAX_CONCURRENCY),
+                              max_keepalive_connections=max(1, config.RSS_MAX_CONCURRENCY))
+        _feed_client = httpx.AsyncClient(timeout=20, limits=limits)
+        _feed_client_loop = loop
+    return _feed_client
+
+
+def _url_list(value: str) -> List[str]:
+    return [url for url in value.replace(",", " ").split() if url]
+
+
+def feed_urls() -> List[str]:
+    """Return the configured ``RSS_FEEDS`` (comma or whitespace separated)."""
+    return _url_list(config.RSS_FEEDS)
+
+
+def is_allowed_feed(url: str) -> bool:
+    """True for http(s) URLs listed in ``RSS_FEEDS`` or ``RSS_FEED_ALLOWLIST``."""
+    if urlparse(url).scheme not in ("http", "https"):
+        return False
+    return url in feed_urls() or url in _url_list(config.RSS_FEED_ALLOWLIST)
+
+
+async def update_feeds(urls: Iterable[str], *, force: bool = False) -> Dict[str, Any]:
+    """
+    Ingest every feed in *urls* concurrently and return a per-feed summary.
+    Only http(s) URLs are fetched; anything else is reported as an error.
+
+    At most ``RSS_MAX_CONCURRENCY`` feeds are processed at once, and at most
+    ``RSS_PER_HOST_CONCURRENCY`` of them against the same host. All feeds share
+    one long-lived pooled HTTP client. A failing feed is reported in its own entry and
+    does not abort the others.
+    """
+    urls = list(dict.fromkeys(urls))
+    global_limit = asyncio.Semaphore(max(1, config.RSS_MAX_CONCURRENCY))
+    host_limits: Dict[str, asyncio.Semaphore] = {}
+    started = time.perf_counter()
+
+    async def _ingest(client: httpx.AsyncClient, url: str) -> Dict[str, Any]:
+        host = urlparse(url).netloc
+        host_limit = host_limits.setdefault(
+            host, asyncio.Semaphore(max(1, config.RSS_PER_HOST_CONCURRENCY)))
+        async with host_limit, global_limit:
+            feed_started = time.perf_counter()
+            try:
+                if urlparse(url).scheme not in ("http", "https"):
+                    raise ValueError(f"Only http(s) feeds can be ingested: {url}")
+                counts = await update_rss(url, force=force, client=client)
+                result: Dict[str, Any] = {"url": url, "status": "ok", **counts}
+            except Exception as e:
+                logger.error(f"RSS update failed for {url} : {e}")
+                result = {"url": url, "status": "error", "message": str(e)}
+            result["elapsed_ms"] = round((time.perf_counter() - feed_started) * 1000, 1)
+            return result
+
+    client = _shared_client()
+    feeds = await asyncio.gather(*(_ingest(client, url) for url in urls))
+
+    summary: Dict[str, Any] = {key: sum(f.get(key, 0) for f in feeds)
+                               for key in ("items", "inserted", "updated", "skipped", "unchanged")}
+    failed = sum(1 for f in feeds if f["status"] == "error")
+    summary["status"] = "ok" if not failed else ("partial" if failed < len(feeds) else "error")
+    summary["elapsed_ms"] = round((time.perf_counter() - started) * 1000, 1)
+    summary["feeds"] = feeds
+    return summary
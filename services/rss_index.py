@@ -0,0 +1,104 @@
+"""
+Persistent index of ingested RSS items.
+
+Each item_id is stored with a hash of the row that was last written to
+Supabase and its ``dcterms:modified`` value, so a refresh can tell new items
+from edited ones and skip everything that has not changed.
+"""
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from utils.logger import logger
+from utils.config import config
+
+
+def row_hash(row: Dict[str, Any]) -> str:
+    """Return a stable content hash for a database row."""
+    payload = json.dumps(row, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class SeenIndex:
+    """SQLite-backed map of ``item_id -> (content_hash, modified)``."""
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or config.RSS_INDEX_PATH or os.path.join(os.getcwd(), 'data', 'rss_index.db')
+        self._lock = threading.Lock()
+        self._conn: Optional[sqlite3.Connection] = None
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS seen_items ("
+                " item_id TEXT PRIMARY KEY,"
+                " content_hash TEXT NOT NULL,"
+                " modified TEXT,"
+                " updated_at REAL NOT NULL)"
+            )
+            self._conn = conn
+            logger.debug(f"Opened RSS seen-item index at {self.path}")
+        return self._conn
+
+    def classify(self, rows: Iterable[Dict[str, Any]]
+                 ) -> Tuple[List[Dict[str, Any]], List[Dict[str, Any]], int]:
+        """
+        Split *rows* into ``(new, changed, unchanged_count)``.
+
+        A row is new when its item_id was never recorded and changed when its
+        content hash differs from the recorded one.
+        """
+        rows = list(rows)
+        ids = [row["item_id"] for row in rows]
+        known: Dict[str, str] = {}
+        with self._lock:
+            conn = self._connect()
+            # stay well below SQLite's bound-parameter limit
+            for i in range(0, len(ids), 500):
+                chunk = ids[i:i + 500]
+                marks = ",".join("?" * len(chunk))
+                for item_id, content_hash in conn.execute(
+                        f"SELECT item_id, content_hash FROM seen_items WHERE item_id IN ({marks})",
+                        chunk):
+                    known[item_id] = content_hash
+
+        new: List[Dict[str, Any]] = []
+        changed: List[Dict[str, Any]] = []
+        for row in rows:
+            previous = known.get(row["item_id"])
+            if previous is None:
+                new.append(row)
+            elif previous != row_hash(row):
+                changed.append(row)
+        return new, changed, len(rows) - len(new) - len(changed)
+
+    def record(self, rows: Iterable[Dict[str, Any]]) -> None:
+        """Remember *rows* as the current stored version of their items."""
+        now = time.time()
+        params = [(row["item_id"], row_hash(row), row.get("dcterms_modified"), now)
+                  for row in rows]
+        if not params:
+            return
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    "INSERT INTO seen_items (item_id, content_hash, modified, updated_at)"
+                    " VALUES (?, ?, ?, ?)"
+                    " ON CONFLICT(item_id) DO UPDATE SET"
+                    " content_hash=excluded.content_hash,"
+                    " modified=excluded.modified,"
+                    " updated_at=excluded.updated_at",
+                    params)
+
+
+# Create a singleton instance
+seen_index = SeenIndex()
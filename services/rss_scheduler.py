@@ -0,0 +1,229 @@
+"""
+In-process RSS polling.
+
+Each configured feed is polled by :func:`services.rss.update_rss` on its own
+interval, which follows the feed's observed rate of new items: the scheduler
+aims to find about ``RSS_SCHEDULER_TARGET_NEW_ITEMS`` new items per poll,
+within ``RSS_SCHEDULER_MIN_INTERVAL_SECONDS`` and
+``RSS_SCHEDULER_MAX_INTERVAL_SECONDS``. Failing feeds back off exponentially
+and every delay is jittered so feeds and workers do not poll in lockstep.
+
+Only one process per host polls: the one holding an exclusive lock on
+``RSS_SCHEDULER_LOCK_PATH``. The others retry the lock periodically and take
+over when the leader exits.
+
+Usage:
+    from services.rss_scheduler import rss_scheduler
+
+    rss_scheduler.start()          # no-op unless RSS_SCHEDULER_ENABLED
+"""
+import asyncio
+import os
+import random
+import time
+from dataclasses import asdict, dataclass
+from typing import Any, Dict, List, Optional
+
+try:
+    import fcntl
+except ImportError:                     # Windows: no leader election, every process polls
+    fcntl = None
+
+from services.rss import _shared_client, feed_urls, update_rss
+from utils.config import config
+from utils.event_loop import background_loop
+from utils.logger import logger
+
+LEADER_RETRY_SECONDS = 30
+RATE_SMOOTHING = 0.5                    # weight of the latest poll in the item-rate average
+
+
+@dataclass
+class FeedSchedule:
+    """Polling state of one feed."""
+    url: str
+    interval: float
+    rate: Optional[float] = None        # smoothed new items per second
+    failures: int = 0
+    polls: int = 0
+    last_polled_at: Optional[float] = None
+    last_new_items: int = 0
+    last_status: Optional[str] = None
+    last_error: Optional[str] = None
+    next_poll_at: float = 0.0
+
+    def as_dict(self) -> Dict[str, Any]:
+        return asdict(self)
+
+
+class RssScheduler:
+    """Adaptive per-feed poller running on the process's background event loop."""
+
+    def __init__(self,
+                 min_interval: Optional[float] = None,
+                 max_interval: Optional[float] = None,
+                 target_new_items: Optional[float] = None,
+                 jitter: Optional[float] = None):
+        self.min_interval = min_interval or config.RSS_SCHEDULER_MIN_INTERVAL_SECONDS
+        self.max_interval = max(self.min_interval, max_interval or config.RSS_SCHEDULER_MAX_INTERVAL_SECONDS)
+        self.target_new_items = target_new_items or config.RSS_SCHEDULER_TARGET_NEW_ITEMS
+        self.jitter = config.RSS_SCHEDULER_JITTER if jitter is None else jitter
+        self.lock_path = config.RSS_SCHEDULER_LOCK_PATH or os.path.join(os.getcwd(), 'data', 'rss_scheduler.lock')
+        self.schedules: Dict[str, FeedSchedule] = {}
+        self._lock_fd: Optional[int] = None
+        self._task: Optional["asyncio.Future"] = None
+        self._pid: Optional[int] = None
+        self.error: Optional[str] = None
+
+    # ── interval policy ───────────────────────────────────────────────────
+
+    def _clamp(self, seconds: float) -> float:
+        return min(self.max_interval, max(self.min_interval, seconds))
+
+    def next_interval(self, schedule: FeedSchedule, new_items: int, elapsed: Optional[float]) -> float:
+        """
+        Fold the outcome of a successful poll into *schedule* and return its next interval.
+
+        *elapsed* is the time since the previous poll (None for the first one).
+        A quiet feed slows down by half each time; a busy one is polled about
+        as often as it yields ``target_new_items``.
+        """
+        if elapsed:
+            observed = new_items / elapsed
+            schedule.rate = observed if schedule.rate is None else \
+                RATE_SMOOTHING * observed + (1 - RATE_SMOOTHING) * schedule.rate
+        if not schedule.rate:
+            return self._clamp(schedule.interval * 1.5)
+        return self._clamp(self.target_new_items / schedule.rate)
+
+    def backoff_interval(self, schedule: FeedSchedule) -> float:
+        """Delay before retrying a feed that has failed ``schedule.failures`` times in a row."""
+        return min(config.RSS_SCHEDULER_MAX_BACKOFF_SECONDS,
+                   schedule.interval * 2 ** min(schedule.failures, 10))
+
+    def _jittered(self, seconds: float) -> float:
+        return seconds * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    # ── leader election ───────────────────────────────────────────────────
+
+    def _try_lock(self) -> bool:
+        """Take the host-wide leader lock without blocking; True when held."""
+        if self._lock_fd is not None:
+            return True
+        if fcntl is None:
+            self._lock_fd = -1
+            return True
+        os.makedirs(os.path.dirname(self.lock_path), exist_ok=True)
+        fd = os.open(self.lock_path, os.O_RDWR | os.O_CREAT, 0o644)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            os.close(fd)
+            return False
+        os.ftruncate(fd, 0)
+        os.write(fd, str(os.getpid()).encode())
+        self._lock_fd = fd
+        return True
+
+    def _release_lock(self) -> None:
+        fd, self._lock_fd = self._lock_fd, None
+        if fd is not None and fd >= 0:
+            os.close(fd)                # closing the descriptor drops the flock
+
+    # ── polling ───────────────────────────────────────────────────────────
+
+    async def _poll(self, schedule: FeedSchedule) -> None:
+        now = time.time()
+        elapsed = now - schedule.last_polled_at if schedule.last_polled_at else None
+        try:
+            counts = await update_rss(schedule.url, client=_shared_client())
+        except Exception as e:
+            schedule.failures += 1
+            schedule.last_status, schedule.last_error = "error", str(e)
+            delay = self.backoff_interval(schedule)
+            logger.warning(f"Scheduled RSS poll failed for {schedule.url} "
+                           f"({schedule.failures} in a row), retrying in {delay:.0f}s : {e}")
+        else:
+            schedule.failures, schedule.last_error = 0, None
+            schedule.last_new_items = counts.get("inserted", 0)
+            schedule.last_status = "not_modified" if counts.get("not_modified") else "ok"
+            schedule.interval = self.next_interval(schedule, schedule.last_new_items, elapsed)
+            delay = schedule.interval
+            logger.info(f"Scheduled RSS poll of {schedule.url} : {schedule.last_new_items} new, "
+                        f"next in {delay:.0f}s")
+        schedule.polls += 1
+        schedule.last_polled_at = now
+        schedule.next_poll_at = now + self._jittered(delay)
+
+    async def _feed_loop(self, schedule: FeedSchedule, limit: asyncio.Semaphore) -> None:
+        while True:
+            await asyncio.sleep(max(0.0, schedule.next_poll_at - time.time()))
+            async with limit:
+                await self._poll(schedule)
+
+    async def _run(self, urls: List[str]) -> None:
+        while not self._try_lock():
+            await asyncio.sleep(self._jittered(LEADER_RETRY_SECONDS))
+        logger.info(f"RSS scheduler leader in pid {os.getpid()}, polling {len(urls)} feed(s)")
+
+        initial = self._clamp(config.RSS_SCHEDULER_INITIAL_INTERVAL_SECONDS)
+        now = time.time()
+        self.schedules = {url: FeedSchedule(url=url, interval=initial,
+                                            next_poll_at=now + random.uniform(0, self.jitter * initial))
+                          for url in urls}
+        limit = asyncio.Semaphore(max(1, config.RSS_MAX_CONCURRENCY))
+        try:
+            await asyncio.gather(*(self._feed_loop(s, limit) for s in self.schedules.values()))
+        finally:
+            self._release_lock()
+
+    # ── control ───────────────────────────────────────────────────────────
+
+    def start(self, urls: Optional[List[str]] = None, force: bool = False) -> bool:
+        """
+        Start polling *urls* (default: ``RSS_FEEDS``) in this process.
+
+        Does nothing unless ``RSS_SCHEDULER_ENABLED`` (or *force*), or when
+        already running in this process. Returns True if the scheduler runs.
+        """
+        if not (config.RSS_SCHEDULER_ENABLED or force):
+            return False
+        if self._task is not None and self._pid == os.getpid() and not self._task.done():
+            return True
+        urls = list(dict.fromkeys(urls or feed_urls()))
+        if not urls:
+            logger.warning("RSS scheduler enabled but no feeds are configured")
+            return False
+        self._lock_fd = None            # a forked child does not own its parent's lock
+        self._pid = os.getpid()
+        self.error = None
+        self._task = background_loop.submit(self._run(urls))
+        self._task.add_done_callback(self._finished)
+        return True
+
+    def _finished(self, task: "asyncio.Future") -> None:
+        """Log a scheduler that died, e.g. on an unwritable leader lock."""
+        if task.cancelled() or task.exception() is None:
+            return
+        self.error = f"{type(task.exception()).__name__}: {task.exception()}"
+        logger.error(f"RSS scheduler stopped : {self.error}")
+
+    def stop(self) -> None:
+        """Stop polling and give up leadership."""
+        task, self._task = self._task, None
+        if task is not None and self._pid == os.getpid():
+            task.cancel()
+
+    def status(self) -> Dict[str, Any]:
+        """Whether this process polls, and the state of every feed it polls."""
+        running = self._task is not None and self._pid == os.getpid() and not self._task.done()
+        return {"enabled": config.RSS_SCHEDULER_ENABLED,
+                "running": running,
+                "leader": running and self._lock_fd is not None,
+                "pid": os.getpid(),
+                "error": self.error,
+                "feeds": [s.as_dict() for s in self.schedules.values()]}
+
+
+# Create a singleton instance
+rss_scheduler = RssScheduler()
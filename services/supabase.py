@@ -1,19 +1,38 @@
 """
 Centralized database connection management for AgentPress using Supabase.
+
+One warm client is kept per worker process. It owns a pooled ``httpx``
+client with explicit limits and timeouts, is bound to the event loop it was
+created on, and is rebuilt automatically after a fork, a loop change or a
+failed health check.
 """
+import asyncio
+import os
+import time
 import httpx
 from httpx import Timeout, Limits
-from typing import Optional
-from supabase import create_async_client, AsyncClient, AsyncClientOptions   
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+from utils.lazy import lazy_import
 from utils.logger import logger
 from utils.config import config
 
+if TYPE_CHECKING:
+    from supabase import AsyncClient
+
+supabase = lazy_import("supabase")               # imported by the first connection
+
 class DBConnection:
     """Singleton database connection manager using Supabase."""
-    
+
     _instance: Optional['DBConnection'] = None
     _initialized = False
-    _client: Optional[AsyncClient] = None
+    _client: Optional["AsyncClient"] = None
+    _http: Optional[httpx.AsyncClient] = None
+    _loop: Optional[asyncio.AbstractEventLoop] = None
+    _pid: Optional[int] = None
+    _last_ok: float = 0.0
+    _init_lock: Optional[asyncio.Lock] = None
+    _init_lock_loop: Optional[asyncio.AbstractEventLoop] = None
 
     def __new__(cls):
         if cls._instance is None:
@@ -24,53 +43,227 @@ class DBConnection:
         """No initialization needed in __init__ as it's handled in __new__"""
         pass
 
+    @classmethod
+    def _is_current(cls) -> bool:
+        """True when the client exists and belongs to this process and loop."""
+        try:
+            loop = asyncio.get_running_loop()
+        except RuntimeError:
+            loop = None
+        return (cls._initialized
+                and cls._pid == os.getpid()
+                and cls._loop is loop
+                and not (cls._http is not None and cls._http.is_closed))
+
+    @classmethod
+    def _lock(cls) -> asyncio.Lock:
+        """Initialization lock for the running loop (locks can't cross loops)."""
+        loop = asyncio.get_running_loop()
+        if cls._init_lock is None or cls._init_lock_loop is not loop:
+            cls._init_lock = asyncio.Lock()
+            cls._init_lock_loop = loop
+        return cls._init_lock
+
     async def initialize(self):
-        """Initialize the database connection."""
-        if self._initialized:
+        """Initialize the database connection (no-op while the warm client is usable)."""
+        cls = type(self)
+        if cls._is_current():
+            await self._check_health()
+            return
+
+        async with cls._lock():
+            if cls._is_current():
+                return
+            await cls._discard()
+
+            try:
+                supabase_url = config.SUPABASE_URL
+                # Use service role key preferentially for backend operations
+                supabase_key = config.SUPABASE_SERVICE_ROLE_KEY or config.SUPABASE_ANON_KEY
+
+                if not supabase_url or not supabase_key:
+                    logger.error("Missing required environment variables for Supabase connection")
+                    raise RuntimeError("SUPABASE_URL and a key (SERVICE_ROLE_KEY or ANON_KEY) environment variables must be set.")
+
+                logger.debug("Initializing Supabase connection")
+                http = httpx.AsyncClient(
+                    http2=False,
+                    timeout=Timeout(config.SUPABASE_TIMEOUT_SECONDS,
+                                    connect=config.SUPABASE_CONNECT_TIMEOUT_SECONDS),
+                    limits=Limits(max_connections=config.SUPABASE_MAX_CONNECTIONS,
+                                  max_keepalive_connections=config.SUPABASE_MAX_KEEPALIVE,
+                                  keepalive_expiry=config.SUPABASE_KEEPALIVE_EXPIRY),
+                )
+                options = supabase.AsyncClientOptions(httpx_client=http)
+                cls._client = await supabase.create_async_client(
+                    supabase_url,
+                    supabase_key,
+                    options=options)
+                cls._http = http
+                cls._loop = asyncio.get_running_loop()
+                cls._pid = os.getpid()
+                cls._last_ok = time.monotonic()
+                cls._initialized = True
+                key_type = "SERVICE_ROLE_KEY" if config.SUPABASE_SERVICE_ROLE_KEY else "ANON_KEY"
+                logger.debug(f"Database connection initialized with Supabase using {key_type}")
+            except Exception as e:
+                logger.error(f"Database initialization error: {e}")
+                raise RuntimeError(f"Failed to initialize database connection: {str(e)}")
+
+    async def _check_health(self):
+        """
+        Ping PostgREST when the client has been idle longer than
+        ``SUPABASE_HEALTH_CHECK_INTERVAL`` seconds; reconnect if it fails.
+        """
+        cls = type(self)
+        if time.monotonic() - cls._last_ok < config.SUPABASE_HEALTH_CHECK_INTERVAL:
+            return
+        if await self.health_check():
+            return
+        logger.warning("Supabase health check failed, reconnecting")
+        await self.reconnect()
+
+    async def health_check(self) -> bool:
+        """Return True when PostgREST answers on the pooled connection."""
+        cls = type(self)
+        if not cls._is_current():
+            return False
+        try:
+            key = config.SUPABASE_SERVICE_ROLE_KEY or config.SUPABASE_ANON_KEY
+            resp = await cls._http.head(f"{config.SUPABASE_URL.rstrip('/')}/rest/v1/",
+                                        headers={"apikey": key, "Authorization": f"Bearer {key}"})
+            healthy = resp.status_code < 500
+        except httpx.HTTPError as e:
+            logger.debug(f"Supabase health check error: {e}")
+            healthy = False
+        if healthy:
+            cls._last_ok = time.monotonic()
+        return healthy
+
+    async def reconnect(self):
+        """Drop the current client and build a fresh one."""
+        cls = type(self)
+        stale = cls._client
+        async with cls._lock():
+            # concurrent callers share one reconnect instead of undoing each other's
+            if cls._client is stale:
+                await cls._discard()
+        await self.initialize()
+
+    @classmethod
+    async def _discard(cls):
+        """Forget the client, closing its pool when it belongs to the running loop."""
+        http, owner = cls._http, cls._loop
+        cls._client = None
+        cls._http = None
+        cls._loop = None
+        cls._initialized = False
+        if http is None or http.is_closed:
             return
-                
         try:
-            # options = AsyncClientOptions(
-            #             http2=False, 
-            #             postgrest_client_timeout=20
-            #         )
-            supabase_url = config.SUPABASE_URL
-            # Use service role key preferentially for backend operations
-            supabase_key = config.SUPABASE_SERVICE_ROLE_KEY or config.SUPABASE_ANON_KEY
-            
-            if not supabase_url or not supabase_key:
-                logger.error("Missing required environment variables for Supabase connection")
-                raise RuntimeError("SUPABASE_URL and a key (SERVICE_ROLE_KEY or ANON_KEY) environment variables must be set.")
-
-
-            logger.debug("Initializing Supabase connection")
-            self._client = await create_async_client(
-                supabase_url, 
-                supabase_key)
-            self._initialized = True
-            key_type = "SERVICE_ROLE_KEY" if config.SUPABASE_SERVICE_ROLE_KEY else "ANON_KEY"
-            logger.debug(f"Database connection initialized with Supabase using {key_type}")
-        except Exception as e:
-            logger.error(f"Database initialization error: {e}")
-            raise RuntimeError(f"Failed to initialize database connection: {str(e)}")
+            same_loop = owner is asyncio.get_running_loop()
+        except RuntimeError:
+            same_loop = False
+        if same_loop and cls._pid == os.getpid():
+            await http.aclose()
+        # otherwise its loop is gone (or belongs to the parent process);
+        # the sockets are released when the pool is garbage collected
 
     @classmethod
     async def disconnect(cls):
         """Disconnect from the database."""
         if cls._client:
             logger.info("Disconnecting from Supabase database")
-            await cls._client.close()
-            cls._initialized = False
+            await cls._discard()
             logger.info("Database disconnected successfully")
 
     @property
-    async def client(self) -> AsyncClient:
+    async def client(self) -> "AsyncClient":
         """Get the Supabase client instance."""
-        if not self._initialized:
+        if not type(self)._is_current():
             logger.debug("Supabase client not initialized, initializing now")
             await self.initialize()
         if not self._client:
             logger.error("Database client is None after initialization")
             raise RuntimeError("Database not initialized")
         return self._client
-    
\ No newline at end of file
+
+    async def _chunked(self,
+                       items: List[Any],
+                       request: Callable[[Any, List[Any]], Awaitable[Any]],
+                       chunk_size: int,
+                       concurrency: int) -> List[Dict[str, Any]]:
+        """
+        Run ``request(client, chunk)`` for every *chunk_size* slice of *items*,
+        at most *concurrency* at once, and concatenate the returned rows.
+
+        A chunk that fails on a broken connection is retried once on a fresh
+        client.
+        """
+        if not items:
+            return []
+
+        chunk_size = max(1, chunk_size)
+        semaphore = asyncio.Semaphore(max(1, concurrency))
+        chunks = [items[i:i + chunk_size] for i in range(0, len(items), chunk_size)]
+
+        async def _send(chunk: List[Any]) -> List[Dict[str, Any]]:
+            async with semaphore:
+                try:
+                    resp = await request(await self.client, chunk)
+                except httpx.TransportError as e:
+                    logger.warning(f"Supabase connection error ({e!r}), reconnecting")
+                    await self.reconnect()
+                    resp = await request(await self.client, chunk)
+            type(self)._last_ok = time.monotonic()
+            return resp.data or []
+
+        results = await asyncio.gather(*(_send(chunk) for chunk in chunks))
+        return [row for chunk_rows in results for row in chunk_rows]
+
+    async def upsert_batched(self,
+                             table: str,
+                             rows: List[Dict[str, Any]],
+                             *,
+                             on_conflict: str,
+                             ignore_duplicates: bool = False,
+                             chunk_size: int = 200,
+                             concurrency: int = 4) -> List[Dict[str, Any]]:
+        """
+        Upsert *rows* into *table* in chunks of *chunk_size*, keeping at most
+        *concurrency* requests in flight.
+
+        Returns the rows PostgREST sent back. With ``ignore_duplicates=True``
+        those are only the rows that were actually inserted. A chunk that
+        fails on a broken connection is retried once on a fresh client.
+        """
+        async def _upsert(client: "AsyncClient", chunk: List[Dict[str, Any]]):
+            return await (client.table(table)
+                    .upsert(
+                        chunk,
+                        on_conflict=on_conflict,
+                        ignore_duplicates=ignore_duplicates
+                        )
+                    .execute()
+            )
+
+        if rows:
+            logger.debug(f"Upserting {len(rows)} rows into {table} in chunks of {max(1, chunk_size)}")
+        return await self._chunked(rows, _upsert, chunk_size, concurrency)
+
+    async def select_in(self,
+                        table: str,
+                        column: str,
+                        values: List[Any],
+                        *,
+                        columns: str = "*",
+                        chunk_size: int = 200,
+                        concurrency: int = 4) -> List[Dict[str, Any]]:
+        """
+        Return the rows of *table* whose *column* is one of *values*, asking
+        for *chunk_size* values per request and at most *concurrency* at once.
+        """
+        async def _select(client: "AsyncClient", chunk: List[Any]):
+            return await client.table(table).select(columns).in_(column, chunk).execute()
+
+        return await self._chunked(values, _select, chunk_size, concurrency)
@@ -0,0 +1,165 @@
+"""
+On-disk cache of finished transcripts.
+
+Entries are JSON files keyed by a hash of (video ID, model, parameters). The
+cache is an LRU bounded by ``TRANSCRIPT_CACHE_MAX_MB`` with a TTL of
+``TRANSCRIPT_CACHE_TTL_SECONDS``; reads refresh an entry's mtime, which is
+what eviction orders by. Concurrent requests for the same key in one process
+wait on a single in-flight computation instead of starting their own.
+"""
+import hashlib
+import json
+import os
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable, Dict, Optional
+
+from utils.config import config
+from utils.files import atomic_write_json
+from utils.logger import logger
+from utils.metrics import REGISTRY
+
+
+class TranscriptCache:
+    """Disk-backed LRU/TTL cache with in-process single-flight."""
+
+    def __init__(self,
+                 directory: Optional[str] = None,
+                 max_bytes: Optional[int] = None,
+                 ttl_seconds: Optional[int] = None):
+        self.directory = directory or config.TRANSCRIPT_CACHE_DIR or os.path.join(os.getcwd(), 'data', 'transcripts')
+        self.max_bytes = max_bytes if max_bytes is not None else config.TRANSCRIPT_CACHE_MAX_MB * 1024 * 1024
+        self.ttl_seconds = ttl_seconds if ttl_seconds is not None else config.TRANSCRIPT_CACHE_TTL_SECONDS
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+        self._lock = threading.Lock()
+        self._inflight: Dict[str, Future] = {}
+
+    @staticmethod
+    def make_key(video_id: str, model: str, **params: Any) -> str:
+        """Build a cache key from the video, the model and the request parameters."""
+        payload = json.dumps({"video_id": video_id, "model": model, "params": params},
+                             sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str) -> str:
+        return os.path.join(self.directory, f"{key}.json")
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Return the cached value for *key*, or None when missing or expired."""
+        path = self._path(key)
+        try:
+            with open(path, encoding="utf-8") as fh:
+                entry = json.load(fh)
+        except FileNotFoundError:
+            return None
+        except (OSError, ValueError) as e:
+            logger.warning(f"Dropping unreadable transcript cache entry {path}: {e}")
+            self._remove(path)
+            return None
+
+        if time.time() - entry.get("created_at", 0) > self.ttl_seconds:
+            self._remove(path)
+            return None
+        try:
+            os.utime(path)                      # LRU: mark as recently used
+        except OSError:
+            pass
+        return entry.get("value")
+
+    def put(self, key: str, value: Dict[str, Any]) -> None:
+        """Store *value* under *key* and evict old entries if over budget."""
+        try:
+            atomic_write_json(self._path(key), {"created_at": time.time(), "value": value})
+        except OSError as e:
+            logger.warning(f"Could not write transcript cache entry: {e}")
+            return
+        self._evict()
+
+    def get_or_compute(self, key: str, compute: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Return the cached value for *key*, computing and storing it on a miss.
+
+        Only one caller per key runs *compute*; the others block on its result
+        (and share its exception if it fails; failures are not cached).
+        """
+        value = self.get(key)
+        if value is not None:
+            with self._lock:
+                self.hits += 1
+            logger.info(f"Transcript cache hit {key[:12]}")
+            return value
+
+        with self._lock:
+            future = self._inflight.get(key)
+            leader = future is None
+            if leader:
+                future = self._inflight[key] = Future()
+                self.misses += 1
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            logger.info(f"Waiting on in-flight transcript {key[:12]}")
+            return future.result()
+
+        try:
+            value = compute()
+            self.put(key, value)
+            future.set_result(value)
+            return value
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for this process."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits,
+                    "misses": self.misses,
+                    "coalesced": self.coalesced,
+                    "hit_ratio": round(self.hits / lookups, 4) if lookups else 0.0}
+
+    def _evict(self) -> None:
+        """Drop expired entries, then least recently used ones until under budget."""
+        now = time.time()
+        entries = []
+        try:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if not entry.name.endswith(".json"):
+                        continue
+                    try:
+                        st = entry.stat()
+                    except OSError:
+                        continue
+                    entries.append((st.st_mtime, st.st_size, entry.path))
+        except OSError:
+            return
+
+        total = sum(size for _, size, _ in entries)
+        entries.sort()
+        for mtime, size, path in entries:
+            # mtime is refreshed on reads, so it only bounds age for idle entries
+            if total <= self.max_bytes and now - mtime <= self.ttl_seconds:
+                continue
+            self._remove(path)
+            total -= size
+
+    @staticmethod
+    def _remove(path: str) -> None:
+        try:
+            os.remove(path)
+        except OSError:
+            pass
+
+
+# Create a singleton instance
+transcript_cache = TranscriptCache()
+REGISTRY.register_cache("transcript", transcript_cache.stats)
@@ -0,0 +1,307 @@
+"""
+Audio translation pipeline: resolve the URL, download the audio (from YouTube
+or a direct media link), translate it with Groq Whisper.
+
+Downloading and transcribing are guarded by separate process-wide semaphores
+(``TRANSLATION_DOWNLOAD_CONCURRENCY`` / ``TRANSLATION_TRANSCRIBE_CONCURRENCY``)
+so synchronous requests, batches and background jobs share the same limits;
+a batch runs enough workers to keep both stages busy at once. Long audio can
+be transcribed as parallel overlapping segments (see
+``services.audio``).
+"""
+import os
+import shutil
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+from urllib.parse import urlparse
+
+from werkzeug.exceptions import BadRequest, HTTPException, ServiceUnavailable
+
+from services.audio import Segment, preprocess_audio, split_audio
+from services.downloader import Download
+from services.resolver import canonical_youtube_url, resolve_url, resolve_urls, youtube_video_id
+from services.transcript_cache import transcript_cache
+from utils.admission import AdmissionGate
+from utils.config import config
+from utils.lazy import Lazy, lazy_import
+from utils.logger import logger
+from utils.memory import memory_probe
+from utils.metrics import DOWNLOADED_BYTES, UPLOADED_BYTES, track_stage
+
+# Built on first use (or by PRELOAD_CLIENTS), not when a worker imports the app
+groq = lazy_import("groq")
+downloader = Lazy("downloader", Download)
+groq_client = Lazy("groq_client", lambda: groq.Groq())
+
+download_slots = AdmissionGate("download", max(1, config.TRANSLATION_DOWNLOAD_CONCURRENCY),
+                               max_waiting=config.TRANSLATION_STAGE_MAX_QUEUED,
+                               wait_seconds=config.TRANSLATION_STAGE_WAIT_SECONDS,
+                               retry_after=config.ADMISSION_RETRY_AFTER_SECONDS)
+transcribe_slots = AdmissionGate("transcribe", max(1, config.TRANSLATION_TRANSCRIBE_CONCURRENCY),
+                                 max_waiting=config.TRANSLATION_STAGE_MAX_QUEUED,
+                                 wait_seconds=config.TRANSLATION_STAGE_WAIT_SECONDS,
+                                 retry_after=config.ADMISSION_RETRY_AFTER_SECONDS)
+
+
+TRANSLATION_MODEL = "whisper-large-v3"
+TRANSLATION_PARAMS: Dict[str, Any] = {"response_format": "json", "temperature": 0.0}
+
+
+EventCallback = Callable[[str, Dict[str, Any]], None]
+
+
+def _no_events(event: str, data: Dict[str, Any]) -> None:
+    pass
+
+
+@track_stage("translation")
+def translate_audio(audio_url: str,
+                    chunked: Optional[bool] = None,
+                    on_event: Optional[EventCallback] = None,
+                    force_whisper: bool = False) -> Dict[str, Any]:
+    """
+    Run the whole pipeline for *audio_url* and return ``{"text": …}``.
+
+    YouTube links go through yt-dlp; any other http(s) URL is treated as a
+    direct media file (podcast MP3, …) and streamed to disk.
+
+    With *chunked* (default ``TRANSCRIBE_CHUNKED``) the audio is split into
+    overlapping segments that are transcribed in parallel; the result then
+    also carries ``segments`` with absolute timestamps, and videos up to
+    ``CHUNKED_MAX_DURATION_MINUTES`` are accepted.
+
+    YouTube videos that already have captions in ``CAPTIONS_LANGUAGES`` are
+    answered from the caption track, without downloading audio; the result
+    then has ``source: "captions"``. *force_whisper* always transcribes.
+
+    Transcripts are cached per video ID (or media URL), model and parameters; concurrent
+    requests for the same video share one download and one Groq call.
+
+    *on_event* is called as ``on_event(name, data)`` while the pipeline runs:
+    ``resolved``, ``captions`` (fast path only), ``downloaded``,
+    ``transcoding``, ``transcoded``, ``transcribing`` and one ``segment`` per
+    piece of transcript, in order.
+    It may be called from worker threads. Cache hits and requests that join
+    an in-flight job emit only ``resolved``.
+
+    Raises ``BadRequest`` for unsupported or rejected media; other exceptions
+    propagate from yt-dlp or the Groq SDK.
+    """
+    emit = on_event or _no_events
+    chunked = config.TRANSCRIBE_CHUNKED if chunked is None else chunked
+    final_url = resolve_url(audio_url)
+    video_id = youtube_video_id(final_url)
+
+    if "youtube" in final_url.lower() or video_id:
+        logger.info("Youtube Translation Processing")
+        media_url, direct = canonical_youtube_url(final_url), False
+    elif urlparse(final_url).scheme in ("http", "https"):
+        logger.info("Direct Media Translation Processing")
+        media_url, direct = final_url, True
+    else:
+        raise BadRequest("Only YouTube or http(s) media URLs are supported")
+
+    emit("resolved", {"url": media_url, "video_id": video_id})
+    cache_id = video_id or (media_url if direct else None)
+    if not config.TRANSCRIPT_CACHE_ENABLED or not cache_id:
+        return _translate_media(media_url, chunked, emit, direct, force_whisper)
+
+    extra = {"force_whisper": True} if force_whisper else {}
+    key = transcript_cache.make_key(cache_id, TRANSLATION_MODEL, chunked=chunked, **TRANSLATION_PARAMS, **extra)
+    return transcript_cache.get_or_compute(
+        key, lambda: _translate_media(media_url, chunked, emit, direct, force_whisper))
+
+
+def translate_batch(audio_urls: List[str],
+                    chunked: Optional[bool] = None,
+                    force_whisper: bool = False) -> Dict[str, Any]:
+    """
+    Translate many URLs and return one result per input URL, in input order.
+
+    URLs are resolved up front and grouped by video ID, so each distinct
+    video is downloaded and transcribed once. Videos are processed by
+    ``TRANSLATION_DOWNLOAD_CONCURRENCY + TRANSLATION_TRANSCRIBE_CONCURRENCY``
+    workers: while some hold a transcription slot, others download the next
+    videos. Each result is ``{"audio_url", "video_id", "status", "result"}``
+    or, on failure, carries ``error`` and ``error_code`` instead of
+    ``result``.
+    """
+    started = time.perf_counter()
+    outcomes: Dict[str, Dict[str, Any]] = {}
+    keys: List[str] = []
+    todo: Dict[str, str] = {}               # dedupe key -> URL to translate
+
+    for entry in resolve_urls(audio_urls):
+        if "error" in entry:
+            key = f"unresolved:{entry['url']}"
+            outcomes[key] = {"video_id": None, "status": "failed",
+                             "error": f"Could not resolve URL: {entry['error']}", "error_code": 400}
+        else:
+            video_id = youtube_video_id(entry["final_url"])
+            key = video_id or entry["final_url"]
+            todo.setdefault(key, entry["final_url"])
+        keys.append(key)
+
+    def _one(key: str) -> Dict[str, Any]:
+        video_id = youtube_video_id(todo[key])
+        try:
+            return {"video_id": video_id, "status": "succeeded",
+                    "result": translate_audio(todo[key], chunked=chunked, force_whisper=force_whisper)}
+        except HTTPException as e:
+            return {"video_id": video_id, "status": "failed", "error": e.description, "error_code": e.code}
+        except Exception as e:
+            logger.error(f"Batch translation of {todo[key]} failed : {e}")
+            return {"video_id": video_id, "status": "failed", "error": str(e), "error_code": 500}
+
+    if todo:
+        workers = max(1, min(config.TRANSLATION_DOWNLOAD_CONCURRENCY + config.TRANSLATION_TRANSCRIBE_CONCURRENCY,
+                             len(todo)))
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="translate") as pool:
+            outcomes.update(zip(todo, pool.map(_one, todo)))
+
+    results = [{"audio_url": url, **outcomes[key]} for url, key in zip(audio_urls, keys)]
+    failed = sum(1 for key in set(keys) if outcomes[key]["status"] == "failed")
+    elapsed_ms = round((time.perf_counter() - started) * 1000)
+    logger.info(f"Batch translation : {len(audio_urls)} URL(s), {len(set(keys))} distinct, "
+                f"{failed} failed, {elapsed_ms} ms")
+    return {"results": results,
+            "total": len(audio_urls),
+            "distinct": len(set(keys)),
+            "failed": failed,
+            "elapsed_ms": elapsed_ms}
+
+
+def _translate_media(media_url: str,
+                     chunked: bool = False,
+                     emit: EventCallback = _no_events,
+                     direct: bool = False,
+                     force_whisper: bool = False) -> Dict[str, Any]:
+    """Download *media_url* (YouTube, or a direct media link) and translate its audio with Groq."""
+    if not direct and not force_whisper and config.CAPTIONS_ENABLED:
+        captions = downloader.youtube_captions(media_url)
+        if captions is not None:
+            return _captions_result(captions, chunked, emit)
+
+    free_mb = shutil.disk_usage(tempfile.gettempdir()).free / 2**20
+    if free_mb < config.TRANSLATION_MIN_FREE_DISK_MB:
+        logger.warning(f"Refusing download, only {free_mb:.0f} MB free in {tempfile.gettempdir()}")
+        raise ServiceUnavailable("Not enough temporary disk space, retry later",
+                                 retry_after=config.ADMISSION_RETRY_AFTER_SECONDS)
+    with memory_probe("Media translation"), tempfile.TemporaryDirectory() as temp_dir:
+
+        # ── 1.  Download the file safely to a temp location ────────────────
+        logger.info("Downloading media started.")
+        max_minutes = config.CHUNKED_MAX_DURATION_MINUTES if chunked else None
+        fetch = downloader.download_direct_audio if direct else downloader.download_youtube_audio
+        with download_slots:
+            downloaded_path = fetch(media_url, temp_dir, max_duration_minutes=max_minutes)
+        logger.info("Donwloading media completed successfully.")
+        downloaded_bytes = os.path.getsize(downloaded_path)
+        DOWNLOADED_BYTES.inc(downloaded_bytes, source="direct" if direct else "youtube")
+        emit("downloaded", {"bytes": downloaded_bytes})
+
+        # ── 2.  Shrink to compact speech audio before upload ──────────────
+        if config.AUDIO_PREPROCESS:
+            emit("transcoding", {"codec": config.AUDIO_PREPROCESS_CODEC})
+            with track_stage("transcode"):
+                pre = preprocess_audio(downloaded_path, temp_dir,
+                                       codec=config.AUDIO_PREPROCESS_CODEC,
+                                       bitrate=config.AUDIO_OPUS_BITRATE,
+                                       trim_silence=config.AUDIO_TRIM_SILENCE)
+            downloaded_path = pre.path
+            emit("transcoded", {"original_bytes": pre.original_bytes,
+                                "processed_bytes": pre.processed_bytes,
+                                "saved_bytes": pre.saved_bytes})
+
+        # ── 3.  Translation with Groq ────────────────────────────────────
+        logger.info("Audio Translation Started.")
+        if chunked:
+            result = _transcribe_chunked(downloaded_path, temp_dir, emit)
+        else:
+            emit("transcribing", {"segments": 1})
+            result = {"text": _transcribe_file(downloaded_path).text}
+            emit("segment", {"text": result["text"]})
+
+        logger.info("\nAudio Translation Completed.\n")
+        return result
+
+
+def _captions_result(captions: Dict[str, Any], chunked: bool, emit: EventCallback) -> Dict[str, Any]:
+    """Shape a caption track like a Whisper result (``segments`` only when *chunked*)."""
+    logger.info(f"Using {captions['kind']} captions ({captions['language']}) instead of Whisper")
+    emit("captions", {"language": captions["language"], "kind": captions["kind"]})
+    result: Dict[str, Any] = {"text": captions["text"], "source": "captions",
+                              "language": captions["language"]}
+    if chunked:
+        result["segments"] = captions["segments"]
+        for part in captions["segments"]:
+            emit("segment", part)
+    else:
+        emit("segment", {"text": captions["text"]})
+    return result
+
+
+def _transcribe_file(path: str, **overrides: Any) -> Any:
+    """
+    Send one audio file to Groq, holding a transcription slot.
+
+    The open file handle is passed through to httpx, which streams the
+    multipart body from disk; the audio is never loaded into memory whole.
+    """
+    params = {**TRANSLATION_PARAMS, **overrides}
+    with transcribe_slots, open(path, "rb") as file, track_stage("transcribe"):
+        UPLOADED_BYTES.inc(os.fstat(file.fileno()).st_size, target="groq")
+        return groq_client.audio.translations.create(
+            file=(os.path.basename(path), file),
+            model=TRANSLATION_MODEL,
+            **params
+            )
+
+
+def _transcribe_chunked(path: str, temp_dir: str,
+                        emit: EventCallback = _no_events) -> Dict[str, Any]:
+    """
+    Split *path* into segments, transcribe them in parallel and stitch the
+    result; each segment's text is emitted as soon as it and all earlier
+    segments are done.
+    """
+    segments = split_audio(path, temp_dir,
+                           target_seconds=config.CHUNK_SECONDS,
+                           overlap_seconds=config.CHUNK_OVERLAP_SECONDS,
+                           on_silence=config.CHUNK_ON_SILENCE)
+    emit("transcribing", {"segments": len(segments)})
+    workers = max(1, min(config.CHUNK_CONCURRENCY, len(segments)))
+    stitched: List[Dict[str, Any]] = []
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="chunk") as pool:
+        responses = pool.map(
+            lambda seg: _transcribe_file(seg.path, response_format="verbose_json"), segments)
+        for seg, resp in zip(segments, responses):       # map() yields in segment order
+            for part in _owned_parts(seg, resp, last=len(segments) - 1):
+                stitched.append(part)
+                emit("segment", part)
+    return {"text": " ".join(p["text"] for p in stitched if p["text"]),
+            "segments": stitched}
+
+
+def _field(obj: Any, name: str, default: Any = None) -> Any:
+    return obj.get(name, default) if isinstance(obj, dict) else getattr(obj, name, default)
+
+
+def _owned_parts(seg: Segment, resp: Any, last: int) -> List[Dict[str, Any]]:
+    """Phrases of one segment's transcription that this segment owns, in absolute time."""
+    parts = _field(resp, "segments") or []
+    if not parts:
+        return [{"start": round(seg.start, 2), "end": round(seg.end, 2),
+                 "text": (_field(resp, "text") or "").strip()}]
+    owned = []
+    for part in parts:
+        start = seg.cut_start + float(_field(part, "start", 0.0))
+        end = seg.cut_start + float(_field(part, "end", 0.0))
+        mid = (start + end) / 2
+        if (seg.index > 0 and mid < seg.start) or (seg.index < last and mid >= seg.end):
+            continue
+        owned.append({"start": round(start, 2), "end": round(end, 2),
+                      "text": (_field(part, "text") or "").strip()})
+    return owned
@@ -0,0 +1,140 @@
+"""
+Admission control: concurrency gates with bounded wait queues, and
+per-client token-bucket rate limits.
+
+Both turn overload into an immediate HTTP error carrying ``Retry-After``
+(503 from a full gate, 429 from an exhausted bucket) instead of letting
+requests pile up on workers, disk and bandwidth.
+
+Usage:
+    from utils.admission import AdmissionGate, RateLimiter
+
+    gate = AdmissionGate("translation", limit=4, max_waiting=4, wait_seconds=10)
+    with gate:                        # raises ServiceUnavailable when saturated
+        ...
+
+    limiter = RateLimiter("translation", per_minute=30, burst=10)
+    limiter.check(client_ip)          # raises TooManyRequests when over the rate
+"""
+
+import math
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Tuple
+
+from werkzeug.exceptions import ServiceUnavailable, TooManyRequests
+
+from utils.logger import logger
+from utils.metrics import counter, gauge
+
+ADMISSION_REJECTED = counter("util_admission_rejected_total",
+                             "Requests turned away by admission control.", ("gate", "reason"))
+ADMISSION_ACTIVE = gauge("util_admission_active", "Holders of each admission gate.", ("gate",))
+ADMISSION_WAITING = gauge("util_admission_waiting", "Callers queued on each admission gate.", ("gate",))
+
+
+class AdmissionGate:
+    """
+    Let at most *limit* callers in at once.
+
+    Up to *max_waiting* more callers wait for a free slot, each for at most
+    *wait_seconds*; anyone beyond that, or still waiting at the deadline, gets
+    ``ServiceUnavailable`` with ``Retry-After: retry_after``. A *limit* of 0
+    or less disables the gate.
+    """
+
+    def __init__(self, name: str, limit: int, max_waiting: int = 0,
+                 wait_seconds: float = 0.0, retry_after: int = 5):
+        self.name = name
+        self.limit = limit
+        self.max_waiting = max(0, max_waiting)
+        self.wait_seconds = wait_seconds
+        self.retry_after = retry_after
+        self.active = 0
+        self.waiting = 0
+        self.rejected = 0
+        self._cond = threading.Condition()
+
+    def _reject(self, reason: str) -> ServiceUnavailable:
+        self.rejected += 1
+        ADMISSION_REJECTED.inc(gate=self.name, reason=reason)
+        logger.warning(f"Admission gate {self.name} {reason} "
+                       f"({self.active} active, {self.waiting} waiting)")
+        return ServiceUnavailable(f"Server busy ({self.name}), retry later",
+                                  retry_after=self.retry_after)
+
+    def acquire(self) -> None:
+        """Take a slot, waiting in the bounded queue if needed."""
+        if self.limit <= 0:
+            return
+        with self._cond:
+            if self.active >= self.limit:
+                if self.waiting >= self.max_waiting:
+                    raise self._reject("queue_full")
+                self.waiting += 1
+                ADMISSION_WAITING.set(self.waiting, gate=self.name)
+                try:
+                    admitted = self._cond.wait_for(lambda: self.active < self.limit,
+                                                   timeout=self.wait_seconds)
+                finally:
+                    self.waiting -= 1
+                    ADMISSION_WAITING.set(self.waiting, gate=self.name)
+                if not admitted:
+                    raise self._reject("wait_timeout")
+            self.active += 1
+            ADMISSION_ACTIVE.set(self.active, gate=self.name)
+
+    def release(self) -> None:
+        if self.limit <= 0:
+            return
+        with self._cond:
+            self.active -= 1
+            ADMISSION_ACTIVE.set(self.active, gate=self.name)
+            self._cond.notify()
+
+    def __enter__(self) -> "AdmissionGate":
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.release()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {"limit": self.limit, "active": self.active, "waiting": self.waiting,
+                    "max_waiting": self.max_waiting, "rejected": self.rejected}
+
+
+class RateLimiter:
+    """
+    Token bucket per client key: *per_minute* requests on average, bursts of
+    up to *burst*. At most *max_clients* buckets are kept (least recently
+    seen dropped first). A *per_minute* of 0 or less disables the limiter.
+    """
+
+    def __init__(self, name: str, per_minute: float, burst: int, max_clients: int = 10000):
+        self.name = name
+        self.rate = per_minute / 60.0
+        self.burst = max(1, burst)
+        self.max_clients = max_clients
+        self._buckets: "OrderedDict[str, Tuple[float, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def check(self, key: str) -> None:
+        """Spend one token of *key*'s bucket or raise ``TooManyRequests``."""
+        if self.rate <= 0:
+            return
+        now = time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.pop(key, (float(self.burst), now))
+            tokens = min(float(self.burst), tokens + (now - last) * self.rate)
+            allowed = tokens >= 1.0
+            self._buckets[key] = (tokens - 1.0 if allowed else tokens, now)
+            if len(self._buckets) > self.max_clients:
+                self._buckets.popitem(last=False)
+        if not allowed:
+            ADMISSION_REJECTED.inc(gate=self.name, reason="rate_limited")
+            retry_after = max(1, math.ceil((1.0 - tokens) / self.rate))
+            raise TooManyRequests(f"Rate limit exceeded for {self.name}, retry in {retry_after}s",
+                                  retry_after=retry_after)
@@ -38,12 +38,114 @@ class Configuration:
     
     # Environment mode
     ENV_MODE: EnvMode = EnvMode.LOCAL
+
+    # Logging
+    LOG_FORMAT: str = "text"                # "text" or "json"
+    LOG_QUEUE_ENABLED: bool = True
+    LOG_QUEUE_SIZE: int = 10000
+    LOG_SAMPLE_RATES: str = ""              # e.g. "util-service.rss.items=0.01"
+    LOG_RATE_LIMIT_PER_SECOND: float = 0.0  # per call site, DEBUG/INFO only; 0 = unlimited
    
     # Supabase configuration
     SUPABASE_URL: str
     SUPABASE_ANON_KEY: str
     SUPABASE_SERVICE_ROLE_KEY: str
+    SUPABASE_TIMEOUT_SECONDS: float = 20.0
+    SUPABASE_CONNECT_TIMEOUT_SECONDS: float = 5.0
+    SUPABASE_MAX_CONNECTIONS: int = 20
+    SUPABASE_MAX_KEEPALIVE: int = 10
+    SUPABASE_KEEPALIVE_EXPIRY: float = 60.0
+    SUPABASE_HEALTH_CHECK_INTERVAL: int = 300
+
+    # URL resolution
+    RESOLVE_POOL_SIZE: int = 20
+    RESOLVE_CONCURRENCY: int = 16
+    RESOLVE_CACHE_SIZE: int = 4096
+    RESOLVE_CACHE_TTL_SECONDS: int = 3600
+    RESOLVE_NEGATIVE_TTL_SECONDS: int = 60
+    RESOLVE_MAX_BODY_BYTES: int = 65536
+    RESOLVE_MAX_BATCH: int = 500
+    RESOLVE_RATE_PER_MINUTE: float = 600.0      # per client; 0 = unlimited
+    RESOLVE_RATE_BURST: int = 100
+
+    # YouTube downloads
+    YTDLP_POOL_SIZE: int = 4
+    YTDLP_INFO_CACHE_SIZE: int = 64
+    YTDLP_INFO_CACHE_TTL_SECONDS: int = 300
+    CAPTIONS_ENABLED: bool = True               # use existing captions instead of Whisper when possible
+    CAPTIONS_LANGUAGES: str = "en"              # comma-separated, in order of preference
+    CAPTIONS_ALLOW_TRANSLATED: bool = False     # accept YouTube's machine-translated captions
+
+    # Direct media downloads
+    MEDIA_POOL_SIZE: int = 8
+    MEDIA_TIMEOUT_SECONDS: float = 30.0
+    MEDIA_RANGE_PARTS: int = 4
+    MEDIA_RANGE_MIN_MB: int = 8
+
+    # Audio translation
+    TRANSLATION_DOWNLOAD_CONCURRENCY: int = 2
+    TRANSLATION_TRANSCRIBE_CONCURRENCY: int = 4
+    TRANSLATION_MAX_BATCH: int = 100
+    TRANSLATION_MAX_INFLIGHT: int = 4           # per worker; 0 = unlimited
+    TRANSLATION_MAX_QUEUED: int = 4
+    TRANSLATION_STAGE_MAX_QUEUED: int = 64      # waiting for a download / transcription slot
+    TRANSLATION_STAGE_WAIT_SECONDS: float = 600.0
+    TRANSLATION_MIN_FREE_DISK_MB: int = 512
+    TRANSLATION_RATE_PER_MINUTE: float = 30.0   # per client; 0 = unlimited
+    TRANSLATION_RATE_BURST: int = 10
+    ADMISSION_WAIT_SECONDS: float = 10.0
+    ADMISSION_RETRY_AFTER_SECONDS: int = 5
+    TRUSTED_PROXY_HOPS: int = 0                 # reverse proxies whose X-Forwarded-For is trusted
+    AUDIO_PREPROCESS: bool = True
+    AUDIO_PREPROCESS_CODEC: str = "opus"
+    AUDIO_OPUS_BITRATE: str = "32k"
+    AUDIO_TRIM_SILENCE: bool = False
+    TRANSCRIBE_CHUNKED: bool = False
+    CHUNK_SECONDS: int = 300
+    CHUNK_OVERLAP_SECONDS: float = 2.0
+    CHUNK_ON_SILENCE: bool = True
+    CHUNK_CONCURRENCY: int = 4
+    CHUNKED_MAX_DURATION_MINUTES: int = 180
+    TRANSCRIPT_CACHE_ENABLED: bool = True
+    TRANSCRIPT_CACHE_DIR: Optional[str] = None
+    TRANSCRIPT_CACHE_MAX_MB: int = 256
+    TRANSCRIPT_CACHE_TTL_SECONDS: int = 604800
+
+    # Background jobs
+    JOB_WORKERS: int = 4
+    JOB_RETENTION_SECONDS: int = 86400
+    JOBS_DIR: Optional[str] = None
+    JOB_MAX_PENDING: int = 100
+
+    # RSS ingestion
+    RSS_FEEDS: str = "https://www.maariv.co.il/Rss/RssFeedsAllNews?id=msn"
+    RSS_FEED_ALLOWLIST: str = ""                # extra feeds /update-rss?feed=… may ingest
+    RSS_MAX_CONCURRENCY: int = 8
+    RSS_PER_HOST_CONCURRENCY: int = 2
+    RSS_UPSERT_CHUNK_SIZE: int = 200
+    RSS_UPSERT_CONCURRENCY: int = 4
+    RSS_STREAM_PARSE: bool = False
+    RSS_INDEX_ENABLED: bool = True
+    RSS_INDEX_PATH: Optional[str] = None
+    RSS_SCHEDULER_ENABLED: bool = False
+    RSS_SCHEDULER_INITIAL_INTERVAL_SECONDS: int = 300
+    RSS_SCHEDULER_MIN_INTERVAL_SECONDS: int = 60
+    RSS_SCHEDULER_MAX_INTERVAL_SECONDS: int = 1800
+    RSS_SCHEDULER_MAX_BACKOFF_SECONDS: int = 3600
+    RSS_SCHEDULER_TARGET_NEW_ITEMS: float = 5.0
+    RSS_SCHEDULER_JITTER: float = 0.1
+    RSS_SCHEDULER_LOCK_PATH: Optional[str] = None
+    RSS_FEED_LOCK_DIR: Optional[str] = None     # per-feed locks coalescing runs across workers
+    NEWS_CACHE_ENABLED: bool = True
+    NEWS_CACHE_SIZE: int = 1000                 # newest items kept for /news
+    NEWS_CACHE_PATH: Optional[str] = None       # snapshot shared by the workers
+    NEWS_MAX_LIMIT: int = 500
     
+    # Start-up
+    PRELOAD_CLIENTS: bool = False               # build yt-dlp / Supabase / Groq at boot, not on first use
+    STARTUP_IMPORT_REPORT: bool = True          # log import cost per package at boot
+    STARTUP_IMPORT_BUDGET_MS: int = 0           # warn when start-up imports take longer (0 = off)
+
     def __init__(self):
         """Initialize configuration by loading from environment variables."""
         # Load environment variables from .env file if it exists
@@ -81,6 +183,12 @@ class Configuration:
                         setattr(self, key, int(env_val))
                     except ValueError:
                         logger.warning(f"Invalid value for {key}: {env_val}, using default")
+                elif expected_type == float:
+                    # Handle float conversion
+                    try:
+                        setattr(self, key, float(env_val))
+                    except ValueError:
+                        logger.warning(f"Invalid value for {key}: {env_val}, using default")
                 elif expected_type == EnvMode:
                     # Already handled for ENV_MODE
                     pass
@@ -0,0 +1,92 @@
+"""
+Long-lived asyncio event loop for synchronous callers.
+
+Flask handlers are synchronous; instead of spinning up a thread and a fresh
+loop for every coroutine, each worker process runs one loop in a daemon
+thread and submits work to it with ``run_coroutine_threadsafe``. Async
+resources bound to that loop (HTTP pools, the Supabase client) therefore
+survive across requests.
+
+Usage:
+    from utils.event_loop import background_loop
+
+    result = background_loop.run(some_coroutine())
+"""
+
+import asyncio
+import atexit
+import os
+import threading
+from concurrent.futures import Future
+from typing import Any, Coroutine, Optional, TypeVar
+
+from utils.logger import logger
+
+T = TypeVar("T")
+
+if os.name == "nt":
+    asyncio.set_event_loop_policy(asyncio.WindowsSelectorEventLoopPolicy())
+
+
+class BackgroundLoop:
+    """An event loop running forever in a dedicated thread, one per process."""
+
+    def __init__(self, name: str = "async-loop"):
+        self.name = name
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+    @property
+    def loop(self) -> asyncio.AbstractEventLoop:
+        """Return the running loop, starting it on first use (and after a fork)."""
+        if self._loop is not None and self._pid == os.getpid() and self._thread.is_alive():
+            return self._loop
+        with self._lock:
+            if self._loop is None or self._pid != os.getpid() or not self._thread.is_alive():
+                self._start()
+            return self._loop
+
+    def _start(self) -> None:
+        loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def _run() -> None:
+            asyncio.set_event_loop(loop)
+            loop.call_soon(ready.set)
+            loop.run_forever()
+
+        thread = threading.Thread(target=_run, name=self.name, daemon=True)
+        thread.start()
+        ready.wait()
+        self._loop, self._thread, self._pid = loop, thread, os.getpid()
+        logger.debug(f"Started background event loop in pid {self._pid}")
+
+    def submit(self, coroutine: Coroutine[Any, Any, T]) -> "Future[T]":
+        """Schedule *coroutine* on the loop and return a concurrent Future."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+
+    def run(self, coroutine: Coroutine[Any, Any, T], timeout: Optional[float] = None) -> T:
+        """Run *coroutine* on the loop and block until it finishes."""
+        if self._loop is not None and threading.current_thread() is self._thread:
+            raise RuntimeError("BackgroundLoop.run() called from the loop thread; await instead")
+        future = self.submit(coroutine)
+        try:
+            return future.result(timeout)
+        except TimeoutError:
+            future.cancel()
+            raise
+
+    def stop(self) -> None:
+        """Stop the loop thread (used at interpreter exit)."""
+        loop, thread = self._loop, self._thread
+        if loop is None or self._pid != os.getpid() or not thread.is_alive():
+            return
+        loop.call_soon_threadsafe(loop.stop)
+        thread.join(timeout=5)
+
+
+# Create a singleton instance
+background_loop = BackgroundLoop()
+atexit.register(background_loop.stop)
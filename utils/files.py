@@ -0,0 +1,35 @@
+"""
+File helpers shared by the on-disk stores (jobs, transcript cache, news
+cache, RSS run results).
+
+Usage:
+    from utils.files import atomic_write_json
+
+    atomic_write_json(path, {"status": "done"})
+"""
+import json
+import os
+import threading
+from typing import Any
+
+
+def atomic_write_json(path: str, obj: Any) -> None:
+    """
+    Write *obj* as JSON to *path* so readers never see a partial file.
+
+    The parent directory is created if needed; the data goes to a temporary
+    file (unique per process and thread) that then replaces *path*. Raises
+    ``OSError`` on failure, leaving no temporary file behind.
+    """
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    try:
+        with open(tmp, "w", encoding="utf-8") as fh:
+            json.dump(obj, fh, ensure_ascii=False)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.remove(tmp)
+        except OSError:
+            pass
+        raise
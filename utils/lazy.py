@@ -0,0 +1,85 @@
+"""
+Deferred imports and clients.
+
+``yt_dlp``, ``supabase`` and ``groq`` take a large share of a worker's
+start-up to import, and their clients touch the filesystem and the network
+layer when built, yet plenty of workers (RSS refreshes, ``/news`` reads,
+health checks) never use them. A :class:`Lazy` stands in for such a
+module-level object and builds it on first attribute access, so call sites
+stay unchanged.
+
+Usage:
+    from utils.lazy import Lazy, lazy_import, preload
+
+    yt_dlp = lazy_import("yt_dlp")                  # imported on first use
+    groq_client = Lazy("groq_client", lambda: groq.Groq())
+
+    preload()                                       # build everything now
+
+Annotations must not touch a lazy module at definition time; quote them.
+"""
+import importlib
+import threading
+import time
+from typing import Any, Callable, Dict, List
+
+from utils.logger import logger
+
+_UNSET = object()
+_registry: List["Lazy"] = []
+
+
+class Lazy:
+    """Proxy that calls *factory* once, on first use, and forwards to the result."""
+
+    def __init__(self, name: str, factory: Callable[[], Any]):
+        object.__setattr__(self, "_lazy_name", name)
+        object.__setattr__(self, "_lazy_factory", factory)
+        object.__setattr__(self, "_lazy_target", _UNSET)
+        object.__setattr__(self, "_lazy_lock", threading.Lock())
+        object.__setattr__(self, "_lazy_ms", None)
+        _registry.append(self)
+
+    def _lazy_get(self) -> Any:
+        target = self._lazy_target
+        if target is _UNSET:
+            with self._lazy_lock:
+                target = self._lazy_target
+                if target is _UNSET:
+                    started = time.perf_counter()
+                    target = self._lazy_factory()
+                    elapsed_ms = round((time.perf_counter() - started) * 1000, 1)
+                    object.__setattr__(self, "_lazy_target", target)
+                    object.__setattr__(self, "_lazy_ms", elapsed_ms)
+                    logger.debug(f"Loaded {self._lazy_name} in {elapsed_ms} ms")
+        return target
+
+    @property
+    def loaded(self) -> bool:
+        return self._lazy_target is not _UNSET
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._lazy_get(), name)
+
+    def __setattr__(self, name: str, value: Any) -> None:
+        setattr(self._lazy_get(), name, value)
+
+    def __repr__(self) -> str:
+        state = "loaded" if self.loaded else "not loaded"
+        return f"<Lazy {self._lazy_name} ({state})>"
+
+
+def lazy_import(module: str) -> Lazy:
+    """Stand-in for ``import module`` that imports it on first attribute access."""
+    return Lazy(module, lambda: importlib.import_module(module))
+
+
+def preload() -> Dict[str, float]:
+    """Build every registered lazy object now; return the milliseconds each one took."""
+    started = time.perf_counter()
+    timings = {}
+    for lazy in list(_registry):
+        lazy._lazy_get()
+        timings[lazy._lazy_name] = lazy._lazy_ms
+    logger.info(f"Preloaded {', '.join(timings)} in {(time.perf_counter() - started) * 1000:.0f} ms")
+    return timings
@@ -6,36 +6,57 @@ This module provides a unified logging interface with:
 - Log levels for different environments
 - Correlation IDs for request tracing
 - Contextual information for debugging
+- Non-blocking handlers: records are queued in memory and written to the
+  console and log file by a background listener thread
+- Sampling / rate limiting of high-volume DEBUG and INFO lines
 """
 
+import atexit
 import logging
 import json
+import queue
+import random
 import sys
 import os
+import threading
+import time
 from datetime import datetime, timezone
 from contextvars import ContextVar
 from functools import wraps
 import traceback
-from logging.handlers import RotatingFileHandler
+from logging.handlers import QueueHandler, QueueListener, RotatingFileHandler
+from typing import Dict, List, Optional, Tuple
 
 from utils.config import config, EnvMode
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
 # Context variable for request correlation ID
 request_id: ContextVar[str] = ContextVar('request_id', default='')
 
+
+def _dumps(data: dict) -> str:
+    """Serialize a log entry, with orjson when it is installed."""
+    if orjson is not None:
+        return orjson.dumps(data, default=str).decode('utf-8')
+    return json.dumps(data, default=str, ensure_ascii=False)
+
 class JSONFormatter(logging.Formatter):
     """Custom JSON formatter for structured logging."""
     
     def format(self, record: logging.LogRecord) -> str:
         """Format log record as JSON with contextual information."""
         log_data = {
-            'timestamp': datetime.now(timezone.utc).replace(tzinfo=None).isoformat(),
+            'timestamp': datetime.fromtimestamp(record.created, timezone.utc).replace(tzinfo=None).isoformat(),
             'level': record.levelname,
             'message': record.getMessage(),
             'module': record.module,
             'function': record.funcName,
             'line': record.lineno,
-            'request_id': request_id.get(),
+            'request_id': getattr(record, 'request_id', None) or request_id.get(),
             'thread_id': getattr(record, 'thread_id', None),
             'correlation_id': getattr(record, 'correlation_id', None)
         }
@@ -51,8 +72,135 @@ class JSONFormatter(logging.Formatter):
                 'message': str(record.exc_info[1]),
                 'traceback': traceback.format_exception(*record.exc_info)
             }
+        elif record.exc_text:
+            log_data['exception'] = {'traceback': record.exc_text}
             
-        return json.dumps(log_data)
+        return _dumps(log_data)
+
+
+class SamplingFilter(logging.Filter):
+    """
+    Keep only a fraction of the sub-WARNING records of selected loggers.
+
+    *rates* maps logger names to the fraction kept; a name also covers its
+    child loggers (the longest matching name wins). Warnings and errors are
+    never sampled.
+    """
+
+    def __init__(self, rates: Dict[str, float]):
+        super().__init__()
+        self.rates = dict(rates)
+        self._resolved: Dict[str, float] = {}
+
+    def _rate(self, name: str) -> float:
+        rate = self._resolved.get(name)
+        if rate is None:
+            rate, parts = 1.0, name.split('.')
+            for i in range(len(parts), 0, -1):
+                prefix = '.'.join(parts[:i])
+                if prefix in self.rates:
+                    rate = self.rates[prefix]
+                    break
+            self._resolved[name] = rate
+        return rate
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self._rate(record.name)
+        return rate >= 1.0 or random.random() < rate
+
+
+class RateLimitFilter(logging.Filter):
+    """
+    Let through at most *per_second* sub-WARNING records per call site.
+
+    Each ``file:line`` gets a token bucket holding one second's worth of
+    records (at least one), so a log line inside a hot loop cannot flood the
+    handlers; rates below 1 let a line through every ``1 / per_second`` s.
+    """
+
+    def __init__(self, per_second: float):
+        super().__init__()
+        self.per_second = per_second
+        self.capacity = max(1.0, per_second)
+        self.suppressed = 0
+        self._buckets: Dict[Tuple[str, int], Tuple[float, float]] = {}
+        self._lock = threading.Lock()
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        key, now = (record.pathname, record.lineno), time.monotonic()
+        with self._lock:
+            tokens, last = self._buckets.get(key, (self.capacity, now))
+            tokens = min(self.capacity, tokens + (now - last) * self.per_second)
+            allowed = tokens >= 1.0
+            self._buckets[key] = (tokens - 1.0 if allowed else tokens, now)
+            if not allowed:
+                self.suppressed += 1
+        return allowed
+
+
+class NonBlockingQueueHandler(QueueHandler):
+    """
+    Hand records to a background :class:`QueueListener` without ever blocking.
+
+    The message, request ID and traceback are resolved on the calling thread
+    (the listener cannot see its context); when the queue is full the record
+    is dropped and counted. The listener is restarted after a fork.
+    """
+
+    def __init__(self, log_queue: "queue.Queue", handlers: List[logging.Handler]):
+        super().__init__(log_queue)
+        self.handlers = handlers
+        self.dropped = 0
+        self._listener: Optional[QueueListener] = None
+        self._pid: Optional[int] = None
+        self._start_lock = threading.Lock()
+
+    def start(self) -> None:
+        with self._start_lock:
+            if self._pid == os.getpid():
+                return
+            self._listener = QueueListener(self.queue, *self.handlers, respect_handler_level=True)
+            self._listener.start()
+            self._pid = os.getpid()
+
+    def stop(self) -> None:
+        """Flush the queue and stop the listener (at interpreter exit)."""
+        listener = self._listener
+        if listener is not None and self._pid == os.getpid():
+            listener.stop()
+        self._listener = self._pid = None
+
+    def prepare(self, record: logging.LogRecord) -> logging.LogRecord:
+        record.request_id = request_id.get()
+        record.message = record.getMessage()
+        if record.exc_info:
+            record.exc_text = ''.join(traceback.format_exception(*record.exc_info)).rstrip()
+        record.msg, record.args, record.exc_info = record.message, None, None
+        return record
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        if self._pid != os.getpid():
+            self.start()
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def _parse_sample_rates(spec: str) -> Dict[str, float]:
+    """Parse ``"name=0.1,other.name=0.5"`` into a dict, skipping malformed entries."""
+    rates = {}
+    for entry in spec.replace(';', ',').split(','):
+        name, _, rate = entry.partition('=')
+        try:
+            rates[name.strip()] = min(1.0, max(0.0, float(rate)))
+        except ValueError:
+            continue
+    return rates
 
 def setup_logger(name: str = 'util-service') -> logging.Logger:
     """
@@ -66,6 +214,8 @@ def setup_logger(name: str = 'util-service') -> logging.Logger:
     """
     logger = logging.getLogger(name)
     logger.setLevel(logging.DEBUG)  
+    handlers: List[logging.Handler] = []
+    json_formatter = JSONFormatter() if config.LOG_FORMAT.lower() == 'json' else None
     
     # Create logs directory if it doesn't exist
     log_dir = os.path.join(os.getcwd(), 'logs')
@@ -75,10 +225,12 @@ def setup_logger(name: str = 'util-service') -> logging.Logger:
             print(f"Created log directory at: {log_dir}")
     except Exception as e:
         print(f"Error creating log directory: {e}")
-        return logger
+        log_dir = None
     
     # File handler with rotation
     try:
+        if log_dir is None:
+            raise OSError("no log directory")
         log_file = os.path.join(log_dir, f'{name}_{datetime.now().strftime("%Y%m%d")}.log')
         file_handler = RotatingFileHandler(
             log_file,
@@ -92,10 +244,10 @@ def setup_logger(name: str = 'util-service') -> logging.Logger:
         file_formatter = logging.Formatter(
             '%(asctime)s - %(name)s - %(levelname)s - %(filename)s:%(lineno)d - %(message)s'
         )
-        file_handler.setFormatter(file_formatter)
+        file_handler.setFormatter(json_formatter or file_formatter)
         
         # Add file handler to logger
-        logger.addHandler(file_handler)
+        handlers.append(file_handler)
         print(f"Added file handler for: {log_file}")
     except Exception as e:
         print(f"Error setting up file handler: {e}")
@@ -111,14 +263,34 @@ def setup_logger(name: str = 'util-service') -> logging.Logger:
         console_formatter = logging.Formatter(
             '%(asctime)s - %(levelname)s - %(name)s - %(message)s'
         )
-        console_handler.setFormatter(console_formatter)
+        console_handler.setFormatter(json_formatter or console_formatter)
         
         # Add console handler to logger
-        logger.addHandler(console_handler)
-        logger.info(f"Added console handler with level: {console_handler.level}")
-        logger.info(f"Log file will be created at: {log_dir}")
+        handlers.append(console_handler)
     except Exception as e:
         print(f"Error setting up console handler: {e}")
+
+    # Sampling / rate limits apply before queueing, on the calling thread
+    filters: List[logging.Filter] = []
+    sample_rates = _parse_sample_rates(config.LOG_SAMPLE_RATES)
+    if sample_rates:
+        filters.append(SamplingFilter(sample_rates))
+    if config.LOG_RATE_LIMIT_PER_SECOND > 0:
+        filters.append(RateLimitFilter(config.LOG_RATE_LIMIT_PER_SECOND))
+
+    # Request threads only enqueue; a listener thread does the I/O
+    if config.LOG_QUEUE_ENABLED:
+        queue_handler = NonBlockingQueueHandler(queue.Queue(maxsize=config.LOG_QUEUE_SIZE), handlers)
+        queue_handler.start()
+        atexit.register(queue_handler.stop)
+        handlers = [queue_handler]
+    for handler in handlers:
+        for log_filter in filters:
+            handler.addFilter(log_filter)
+        logger.addHandler(handler)
+
+    if log_dir is not None:
+        logger.info(f"Log file will be created at: {log_dir}")
     
     # # Test logging
     # logger.debug("Logger setup complete - DEBUG test")
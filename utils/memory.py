@@ -0,0 +1,68 @@
+"""
+Cheap process memory measurements for request-level reporting.
+
+Reads the resident set size from ``/proc`` (Linux) and the process
+high-water mark from ``getrusage``; neither needs tracing, so both are safe
+to leave on in production.
+
+Usage:
+    from utils.memory import memory_probe
+
+    with memory_probe("translation") as usage:
+        ...
+    usage["peak_rss_mb"]
+"""
+
+import os
+import sys
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+try:
+    import resource
+except ImportError:                     # Windows
+    resource = None
+
+from utils.logger import logger
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+
+
+def current_rss() -> int:
+    """Resident set size of this process in bytes (0 if unavailable)."""
+    try:
+        with open("/proc/self/statm") as fh:
+            return int(fh.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return peak_rss()
+
+
+def peak_rss() -> int:
+    """Peak resident set size of this process so far, in bytes."""
+    if resource is None:
+        return 0
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024
+
+
+@contextmanager
+def memory_probe(label: str) -> Iterator[Dict[str, float]]:
+    """
+    Measure RSS around a block and log it.
+
+    The yielded dict is filled on exit with ``rss_start_mb``, ``rss_end_mb``,
+    ``rss_delta_mb`` and ``peak_rss_mb`` (process high-water mark, which
+    includes concurrent requests).
+    """
+    usage: Dict[str, float] = {}
+    start = current_rss()
+    try:
+        yield usage
+    finally:
+        end = current_rss()
+        usage.update(rss_start_mb=round(start / 2**20, 1),
+                     rss_end_mb=round(end / 2**20, 1),
+                     rss_delta_mb=round((end - start) / 2**20, 1),
+                     peak_rss_mb=round(peak_rss() / 2**20, 1))
+        logger.info(f"{label} memory : rss {usage['rss_start_mb']} -> {usage['rss_end_mb']} MB "
+                    f"({usage['rss_delta_mb']:+} MB), process peak {usage['peak_rss_mb']} MB")
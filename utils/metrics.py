@@ -0,0 +1,234 @@
+"""
+In-process metrics in the Prometheus text exposition format.
+
+Counters, gauges and histograms with labels, kept per worker process and
+rendered by ``GET /metrics``. Updating a metric is a dict lookup and a few
+additions under a lock, cheap enough to leave on in production.
+
+Usage:
+    from utils.metrics import track_stage, DOWNLOADED_BYTES
+
+    with track_stage("download"):          # latency, outcome and in-flight gauge
+        ...
+    DOWNLOADED_BYTES.inc(size, source="youtube")
+"""
+
+import math
+import os
+from abc import ABC, abstractmethod
+import threading
+import time
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Sequence, Tuple
+
+from utils.logger import logger
+
+LabelValues = Tuple[str, ...]
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0)
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if isinstance(value, float) and not value.is_integer() else str(int(value))
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+    return "{" + ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)) + "}"
+
+
+class _Metric(ABC):
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, str]) -> LabelValues:
+        if len(labels) != len(self.labelnames):
+            raise ValueError(f"{self.name} expects labels {self.labelnames}, got {sorted(labels)}")
+        return tuple(str(labels[n]) for n in self.labelnames)
+
+    @abstractmethod
+    def samples(self) -> List[str]:
+        """Exposition lines for every label set of the metric."""
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    """A monotonically increasing value per label set."""
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [f"{self.name}{_format_labels(self.labelnames, k)} {_format_value(v)}" for k, v in items]
+
+
+class Gauge(Counter):
+    """A value per label set that can go up and down."""
+    kind = "gauge"
+
+    def set(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def dec(self, amount: float = 1.0, **labels: str) -> None:
+        self.inc(-amount, **labels)
+
+
+class Histogram(_Metric):
+    """Cumulative bucket counts, sum and count of observations per label set."""
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._values: Dict[LabelValues, List[float]] = {}     # bucket counts…, sum
+
+    def observe(self, value: float, **labels: str) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [0.0] * (len(self.buckets) + 1)
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[i] += 1
+                    break
+            state[-1] += value
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = [(k, list(v)) for k, v in self._values.items()]
+        names = self.labelnames + ("le",)
+        lines = []
+        for key, state in items:
+            cumulative = 0.0
+            for bound, count in zip(self.buckets, state):
+                cumulative += count
+                lines.append(f"{self.name}_bucket{_format_labels(names, key + (_format_value(bound),))} "
+                             f"{_format_value(cumulative)}")
+            labels = _format_labels(self.labelnames, key)
+            lines.append(f"{self.name}_sum{labels} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{labels} {_format_value(cumulative)}")
+        return lines
+
+
+class Registry:
+    """The metrics of this process, plus cache statistics read at scrape time."""
+
+    def __init__(self):
+        self._metrics: List[_Metric] = []
+        self._caches: Dict[str, Callable[[], Dict[str, float]]] = {}
+        self._lock = threading.Lock()
+
+    def register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            self._metrics.append(metric)
+        return metric
+
+    def register_cache(self, name: str, stats: Callable[[], Dict[str, float]]) -> None:
+        """Expose a cache's ``stats()`` (``hits``/``misses``/``hit_ratio``) as ``util_cache_*``."""
+        with self._lock:
+            self._caches[name] = stats
+
+    def _cache_metrics(self) -> List[_Metric]:
+        hits = Counter("util_cache_hits_total", "Cache lookups served from the cache.", ("cache",))
+        misses = Counter("util_cache_misses_total", "Cache lookups that missed.", ("cache",))
+        ratio = Gauge("util_cache_hit_ratio", "Hits / lookups since process start.", ("cache",))
+        with self._lock:
+            caches = list(self._caches.items())
+        for name, stats in caches:
+            try:
+                values = stats()
+            except Exception as e:
+                logger.warning(f"Could not read stats of cache {name} : {e}")
+                continue
+            hits.inc(values.get("hits", 0), cache=name)
+            misses.inc(values.get("misses", 0), cache=name)
+            ratio.set(values.get("hit_ratio", 0.0), cache=name)
+        return [hits, misses, ratio]
+
+    def render(self) -> str:
+        """All metrics in the Prometheus text format (version 0.0.4)."""
+        PROCESS_INFO.set(1, pid=str(os.getpid()))
+        with self._lock:
+            metrics = list(self._metrics)
+        return "\n".join(m.render() for m in metrics + self._cache_metrics()) + "\n"
+
+
+REGISTRY = Registry()
+
+
+def counter(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+    return REGISTRY.register(Counter(name, documentation, labelnames))
+
+
+def gauge(name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+    return REGISTRY.register(Gauge(name, documentation, labelnames))
+
+
+def histogram(name: str, documentation: str, labelnames: Sequence[str] = (),
+              buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+    return REGISTRY.register(Histogram(name, documentation, labelnames, buckets))
+
+
+# ── shared metrics ────────────────────────────────────────────────────────
+PROCESS_INFO = gauge("util_process_info", "Worker process that served this scrape.", ("pid",))
+STAGE_SECONDS = histogram("util_stage_duration_seconds", "Latency of pipeline stages.", ("stage",))
+STAGE_TOTAL = counter("util_stage_total", "Completed pipeline stages by outcome.", ("stage", "outcome"))
+STAGE_INFLIGHT = gauge("util_stage_inflight", "Pipeline stages currently running.", ("stage",))
+DOWNLOADED_BYTES = counter("util_downloaded_bytes_total", "Bytes downloaded, by source.", ("source",))
+UPLOADED_BYTES = counter("util_uploaded_bytes_total", "Bytes uploaded, by target.", ("target",))
+HTTP_SECONDS = histogram("util_http_request_duration_seconds", "Time to produce a response.", ("endpoint",))
+HTTP_TOTAL = counter("util_http_requests_total", "HTTP responses.", ("endpoint", "method", "status"))
+
+
+def observe_stage(stage: str, seconds: float, outcome: str = "ok") -> None:
+    """Record one completed *stage* that took *seconds*."""
+    STAGE_SECONDS.observe(seconds, stage=stage)
+    STAGE_TOTAL.inc(stage=stage, outcome=outcome)
+
+
+@contextmanager
+def track_stage(stage: str) -> Iterator[None]:
+    """
+    Time a block as one run of *stage* and count it in flight meanwhile.
+
+    The outcome is ``error`` if the block raises. Also usable as a decorator
+    on synchronous functions.
+    """
+    STAGE_INFLIGHT.inc(stage=stage)
+    started = time.perf_counter()
+    outcome = "error"
+    try:
+        yield
+        outcome = "ok"
+    finally:
+        STAGE_INFLIGHT.dec(stage=stage)
+        observe_stage(stage, time.perf_counter() - started, outcome)
@@ -0,0 +1,125 @@
+"""
+Start-up import cost report.
+
+``import_profiler`` times every module executed while it is installed, the
+way ``python -X importtime`` does, but in-process so a booting worker can
+log where its start-up time went. Time is attributed to the module's own
+code (nested imports excluded) and summed per top-level package.
+
+Usage (first lines of the entry point, before any other import):
+    from utils.startup import import_profiler
+    import_profiler.install()
+    ...
+    import_profiler.report()        # uninstalls, logs the summary
+"""
+import sys
+import threading
+import time
+from typing import Any, Dict, List, Optional, Tuple
+
+
+class _TimedLoader:
+    """Wraps a loader's ``exec_module``, then hands the module its real loader back."""
+
+    def __init__(self, loader: Any, profiler: "ImportProfiler"):
+        self._loader = loader
+        self._profiler = profiler
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self._loader, name)
+
+    def create_module(self, spec: Any) -> Any:
+        return self._loader.create_module(spec)
+
+    def exec_module(self, module: Any) -> None:
+        # packages that inspect __loader__ / __spec__.loader see the original
+        module.__loader__ = self._loader
+        if module.__spec__ is not None:
+            module.__spec__.loader = self._loader
+        self._profiler._exec(module.__name__, self._loader, module)
+
+
+class ImportProfiler:
+    """Meta-path hook recording the self time of every module import."""
+
+    def __init__(self):
+        self.self_ms: Dict[str, float] = {}
+        self.started: Optional[float] = None
+        self._stack: List[List[float]] = []          # [start, time spent in nested imports]
+        self._local = threading.local()
+
+    def install(self) -> None:
+        if self not in sys.meta_path:
+            self.started = time.perf_counter()
+            sys.meta_path.insert(0, self)
+
+    def uninstall(self) -> None:
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+
+    def find_spec(self, fullname: str, path: Any = None, target: Any = None) -> Any:
+        if threading.current_thread() is not threading.main_thread() or \
+                getattr(self._local, "finding", False):
+            return None
+        self._local.finding = True
+        try:
+            for finder in sys.meta_path:
+                if finder is self or not hasattr(finder, "find_spec"):
+                    continue
+                spec = finder.find_spec(fullname, path, target)
+                if spec is not None:
+                    break
+            else:
+                return None
+        finally:
+            self._local.finding = False
+        if spec.loader is not None and hasattr(spec.loader, "exec_module"):
+            spec.loader = _TimedLoader(spec.loader, self)
+        return spec
+
+    def _exec(self, name: str, loader: Any, module: Any) -> None:
+        self._stack.append([time.perf_counter(), 0.0])
+        try:
+            loader.exec_module(module)
+        finally:
+            start, nested = self._stack.pop()
+            total = (time.perf_counter() - start) * 1000
+            self.self_ms[name] = total - nested
+            if self._stack:
+                self._stack[-1][1] += total
+
+    def by_package(self) -> List[Tuple[str, float, int]]:
+        """``(package, milliseconds, modules)`` per top-level package, most expensive first."""
+        packages: Dict[str, List[float]] = {}
+        for name, ms in self.self_ms.items():
+            entry = packages.setdefault(name.partition(".")[0], [0.0, 0])
+            entry[0] += ms
+            entry[1] += 1
+        return sorted(((pkg, round(ms, 1), int(n)) for pkg, (ms, n) in packages.items()),
+                      key=lambda row: row[1], reverse=True)
+
+    def report(self, budget_ms: float = 0.0, top: int = 15, detailed: bool = True) -> Dict[str, Any]:
+        """
+        Stop profiling and log the total start-up import time, plus the *top*
+        packages when *detailed*. Exceeding *budget_ms* (when > 0) is logged
+        as a warning.
+        """
+        from utils.logger import logger
+
+        self.uninstall()
+        total_ms = round((time.perf_counter() - (self.started or time.perf_counter())) * 1000, 1)
+        packages = self.by_package()
+        over_budget = 0 < budget_ms < total_ms
+        log = logger.warning if over_budget else logger.info
+        log(f"Start-up imports took {total_ms:.0f} ms for {len(self.self_ms)} modules"
+            + (f" (budget {budget_ms:.0f} ms)" if budget_ms > 0 else ""))
+        if detailed or over_budget:
+            for pkg, ms, count in packages[:top]:
+                logger.info(f"  import {pkg:<24} {ms:8.1f} ms  ({count} modules)")
+        return {"total_ms": total_ms, "modules": len(self.self_ms),
+                "packages": [{"package": pkg, "ms": ms, "modules": count}
+                             for pkg, ms, count in packages[:top]]}
+
+
+# Create a singleton instance
+import_profiler = ImportProfiler()